@@ -0,0 +1,263 @@
+import asyncio
+import json
+import logging
+from time import perf_counter
+
+import aiohttp
+
+from camera_requester import CameraRequester, endpoint_of, null_handler
+from event_loop_thread import EventLoopThread
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncResponse:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncCameraRequester:
+    def __init__(self, requester: CameraRequester, error_prompt, loop_thread: EventLoopThread):
+        # state cache, metrics and frame geometry are shared with the blocking requester, which still moves frames
+        self._requester = requester
+        self._state_cache = requester.state_cache()
+        self._metrics = requester.metrics()
+        self._pool = requester.pool()
+        self._error_prompt = error_prompt
+        self._loop_thread = loop_thread
+        self._batch_supported = True
+        self._session = None
+
+    def _report_error(self, message):
+        logger.error(message)
+        if self._error_prompt is not null_handler:
+            self._loop_thread.call_in_qt(self._error_prompt, message)
+
+    def _get_session(self):
+        # created on the loop thread by the first request, requests to one camera share its connections
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit_per_host=self._pool.pool_size())
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _camera_url(self, endpoint):
+        return self._requester.camera_url(endpoint)
+
+    def _timeout_for(self, url):
+        return aiohttp.ClientTimeout(total=self._pool.timeout_for(url), sock_connect=self._pool.connect_timeout())
+
+    async def _send(self, method, url, **kwargs):
+        start_time = perf_counter()
+        try:
+            async with self._get_session().request(method, url, timeout=self._timeout_for(url), **kwargs) as r:
+                response = AsyncResponse(r.status, r.headers, await r.read())
+        except Exception:
+            self._metrics.record_request(endpoint_of(url), perf_counter() - start_time, ok=False)
+            raise
+        self._metrics.record_request(endpoint_of(url), perf_counter() - start_time, len(response.content),
+                                     response.status_code == 200)
+        return response
+
+    async def _request(self, method, url, **kwargs):
+        logger.debug(f"Trying to reach {url}...")
+        try:
+            response = await self._send(method, url, **kwargs)
+        except asyncio.TimeoutError:
+            self._report_error(f"Connection to {url} timed out!")
+            return None
+        except Exception as e:
+            self._report_error(f"Unknown exception when connecting to {url}: {e}")
+            return None
+
+        if response.status_code != 200:
+            if response.status_code == 422:
+                logger.warning(response.content)
+            self._report_error(f"HTTP error encountered while getting from {url}:\n"
+                               f"status code={response.status_code}")
+            return None
+        return response
+
+    async def _regular_set_url(self, what_to_set, value=None):
+        value_str = str(value) if value is not None else ""
+        return await self._custom_value_set_url(what_to_set, {"value": value_str})
+
+    async def _custom_value_set_url(self, what_to_set, value_dict):
+        self._state_cache.invalidate_for_setter(what_to_set)
+        logger.debug(f"Sending POST with data: {value_dict}")
+        response = await self._request("POST", self._camera_url(what_to_set), json=value_dict)
+        # a refresh running during the POST may have cached the old value again
+        self._state_cache.invalidate_for_setter(what_to_set)
+        return response
+
+    async def _fetch_pair_success_and_value(self, endpoint):
+        response = await self._request("GET", self._camera_url(endpoint))
+        if response is None:
+            return False, None
+        try:
+            value = response.json()["value"]
+        except Exception as e:
+            logger.error(e)
+            return False, None
+        return True, value
+
+    async def _fetch_batch(self, endpoints):
+        if not self._batch_supported:
+            return None
+        url = self._camera_url("get_properties")
+        logger.debug(f"Fetching batch of properties from {url}: {endpoints}")
+        try:
+            response = await self._send("GET", url, params={"names": ",".join(endpoints)})
+        except Exception as e:
+            logger.warning(f"Batched fetch from {url} failed: {e}")
+            return None
+        if response.status_code in (404, 405):
+            logger.info(f"Camera server at {url} does not support batched fetch")
+            self._batch_supported = False
+            return None
+        if response.status_code != 200:
+            logger.warning(f"Batched fetch from {url} returned status code={response.status_code}")
+            return None
+        try:
+            values = response.json()["values"]
+        except Exception as e:
+            logger.error(e)
+            return None
+        return {e: values[e] for e in endpoints if e in values}
+
+    async def _get_pair_success_and_value(self, endpoint):
+        is_fresh, value = self._state_cache.lookup(endpoint)
+        if is_fresh:
+            return True, value
+        is_ok, value = await self._fetch_pair_success_and_value(endpoint)
+        if is_ok:
+            self._state_cache.store(endpoint, value)
+        return is_ok, value
+
+    async def prefetch(self, endpoints, force=False):
+        missing = self._state_cache.stale(endpoints, force)
+        if not missing:
+            return
+        logger.debug(f"Prefetching {len(missing)} properties: {missing}")
+        values = await self._fetch_batch(missing)
+        if values is None:
+            # one request per property, all in flight at once on the loop rather than on worker threads
+            results = await asyncio.gather(*[self._fetch_pair_success_and_value(e) for e in missing])
+            values = {e: value for e, (is_ok, value) in zip(missing, results) if is_ok}
+        for endpoint, value in values.items():
+            self._state_cache.store(endpoint, value)
+
+    async def get_properties(self, endpoints):
+        await self.prefetch(endpoints)
+        results = [await self._get_pair_success_and_value(e) for e in endpoints]
+        return {e: value for e, (is_ok, value) in zip(endpoints, results) if is_ok}
+
+    async def start_capturing(self):
+        return await self._regular_set_url("start_capturing")
+
+    async def stop_capturing(self):
+        return await self._regular_set_url("stop_capturing")
+
+    async def start_saving(self, number, dir_name, prefix=""):
+        return await self._custom_value_set_url("start_saving",
+                                                {"number": number, "dir_name": dir_name, "prefix": prefix})
+
+    async def stop_saving(self):
+        return await self._regular_set_url("stop_saving")
+
+    async def set_binning(self, value):
+        self._requester.binning_changed()
+        response = await self._regular_set_url("set_binx", value)
+        self._requester.binning_changed()
+        return response
+
+    async def set_format(self, value):
+        self._requester.invalidate_frame_geometry()
+        return await self._regular_set_url("set_readoutmode_str", value)
+
+    async def set_gain(self, value):
+        return await self._regular_set_url("set_gain", value)
+
+    async def get_gain(self):
+        return await self._get_pair_success_and_value("get_gain")
+
+    async def get_offset(self):
+        return await self._get_pair_success_and_value("get_offset")
+
+    async def set_offset(self, value):
+        return await self._regular_set_url("set_offset", value)
+
+    async def get_formats(self):
+        return await self._get_pair_success_and_value("get_readoutmodes")
+
+    async def get_current_format(self):
+        return await self._get_pair_success_and_value("get_readoutmode_str")
+
+    async def get_exposure(self):
+        return await self._get_pair_success_and_value("get_exposure")
+
+    async def get_status(self):
+        return await self._get_pair_success_and_value("get_status")
+
+    async def set_exposure(self, value):
+        return await self._regular_set_url("set_exposure", value)
+
+    async def get_temperature(self):
+        return await self._get_pair_success_and_value("get_ccdtemperature")
+
+    async def get_cooler_on(self):
+        return await self._get_pair_success_and_value("get_cooleron")
+
+    async def get_can_turn_on_cooler(self):
+        return await self._get_pair_success_and_value("get_cansetcooleron")
+
+    async def get_can_set_temp(self):
+        return await self._get_pair_success_and_value("get_cansetccdtemperature")
+
+    async def get_can_get_cooler_power(self):
+        return await self._get_pair_success_and_value("get_cangetcoolerpower")
+
+    async def get_cooler_power(self):
+        return await self._get_pair_success_and_value("get_coolerpower")
+
+    async def get_set_temp(self):
+        return await self._get_pair_success_and_value("get_setccdtemperature")
+
+    async def set_set_temp(self, value: int):
+        return await self._regular_set_url("set_setccdtemperature", value)
+
+    async def set_cooler_on(self, value: bool):
+        return await self._regular_set_url("set_cooleron", bool(value))
+
+    async def get_resolution(self):
+        values = await self.get_properties(["get_numx", "get_numy"])
+        if len(values) != 2:
+            return False, None
+        xres = int(values["get_numx"])
+        yres = int(values["get_numy"])
+        logger.debug(f"Resolution = {xres}x{yres}")
+        return True, (xres, yres)
+
+    async def get_possible_binning(self):
+        is_ok, maxbin = await self._get_pair_success_and_value("get_maxbinx")
+        if not is_ok:
+            return []
+        logger.debug(f"Max possible bin is {maxbin}")
+        return list(range(1, maxbin+1))
+
+    async def get_binning(self):
+        return await self._get_pair_success_and_value("get_binx")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def call(self, coro, callback=None):
+        # runs the coroutine on the loop thread, callback gets its result on the Qt GUI thread
+        return self._loop_thread.submit_to_qt(coro, callback)
@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+from time import perf_counter
+
+from camera_discovery import CameraDiscovery, discovery_targets
+from stand_in_server import StandInServer, StandInCamera
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover several local stand-in camera servers")
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--subnet", default="127.0.0.0/24")
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    servers = [StandInServer(0, cameras=[StandInCamera(name=f"Stand-in camera {i}")]).start()
+               for i in range(args.servers)]
+    try:
+        ports = [server.port() for server in servers]
+        addresses = discovery_targets([], args.subnet, ports)
+        discovery = CameraDiscovery(None, timeout_s=args.timeout)
+
+        start_time = perf_counter()
+        found = asyncio.run(discovery.discover(addresses, lambda s: print(f"{perf_counter() - start_time:6.2f}s {s}")))
+        elapsed = perf_counter() - start_time
+
+        print(f"Probed {len(addresses)} addresses in {elapsed:.2f}s, found {len(found)} of {len(servers)} servers")
+    finally:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
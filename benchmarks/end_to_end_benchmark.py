@@ -0,0 +1,135 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from time import perf_counter, process_time, sleep, time
+
+from PyQt5.QtWidgets import QApplication
+
+import camera_requester
+from camera_requester import CameraRequester, standalone_get_request
+from display_stretch import DisplayStretch
+from frame_buffer_ring import FrameBufferRing
+from frame_compression import receive_frame
+from frame_freshness import sequence_from_headers
+from frame_geometry import FrameRegion
+from frame_statistics import frame_statistics
+from image_acquisition_widget import pixels_from_buffer, qimage_from_pixels, qimage_from_jpg, pixels_from_qimage
+from stand_in_server import frame_timestamp_header
+
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# readout format on the server and whether the client asks for JPEG
+formats = {"RAW8": ("RAW8", False), "RAW16": ("RAW16", False), "JPEG": ("RAW8", True)}
+binnings = [1, 2, 4]
+
+
+def start_server(args):
+    command = [sys.executable, "stand_in_server.py", "--port", str(args.port), "--width", str(args.width),
+               "--height", str(args.height), "--latency-ms", str(args.latency_ms),
+               "--bandwidth-mbps", str(args.bandwidth_mbps)]
+    # the server runs in its own process so that its CPU time is not counted for the client
+    server = subprocess.Popen(command, cwd=repo_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    address = f"127.0.0.1:{args.port}"
+    for _ in range(50):
+        if standalone_get_request(f"{camera_requester.server_url(address)}/cameras_list") is not None:
+            return server, address
+        sleep(0.1)
+    server.kill()
+    raise RuntimeError(f"Stand-in server did not start on {address}")
+
+
+def receive_and_decode(requester, send_as_jpg, geometry, stretch, buffer_ring, last_sequence, roi=None):
+    response = requester.get_last_image(send_as_jpg, wait_after=last_sequence, wait_timeout_s=5.0, roi=roi)
+    if response is None or response.status_code == 304:
+        return last_sequence, None
+    sequence = sequence_from_headers(response.headers)
+    captured_at = float(response.headers[frame_timestamp_header])
+    if send_as_jpg:
+        q_img = qimage_from_jpg(response.content)
+        frame_statistics(pixels_from_qimage(q_img))
+    else:
+        content, _ = receive_frame(response, buffer_ring)
+        pixels = pixels_from_buffer(content, geometry)
+        qimage_from_pixels(pixels, stretch, frame_statistics(pixels))
+    return sequence, time() - captured_at
+
+
+def measure(requester, name, binning, args, roi_size=None):
+    readout_format, send_as_jpg = formats[name]
+    requester.set_format(readout_format)
+    requester.set_binning(binning)
+    requester.set_exposure(str(args.exposure))
+    geometry = requester.get_frame_geometry()
+    roi = None
+    if roi_size is not None:
+        # a box in the middle of the frame, as drawn around a star for focusing
+        roi = FrameRegion((geometry.width - roi_size) // 2, (geometry.height - roi_size) // 2, roi_size, roi_size)
+        roi = roi.clamped(geometry.width, geometry.height)
+        geometry = geometry.cropped(roi)
+        name = f"{name} ROI"
+    stretch = DisplayStretch()
+    buffer_ring = FrameBufferRing()
+
+    last_sequence = -1
+    for _ in range(args.warmup):
+        last_sequence, _ = receive_and_decode(requester, send_as_jpg, geometry, stretch, buffer_ring, last_sequence,
+                                              roi)
+
+    latencies = []
+    start_time = perf_counter()
+    start_cpu = process_time()
+    while perf_counter() - start_time < args.duration:
+        last_sequence, latency = receive_and_decode(requester, send_as_jpg, geometry, stretch, buffer_ring,
+                                                    last_sequence, roi)
+        if latency is not None:
+            latencies.append(latency)
+    elapsed = perf_counter() - start_time
+    cpu = process_time() - start_cpu
+
+    frames = len(latencies)
+    if not frames:
+        return f"{name:9} {binning:>3} {f'{geometry.width}x{geometry.height}':>10}   no frames received"
+    return (f"{name:9} {binning:>3} {f'{geometry.width}x{geometry.height}':>10} {frames / elapsed:>7.1f} "
+            f"{statistics.median(latencies) * 1000:>10.1f}ms {max(latencies) * 1000:>10.1f}ms "
+            f"{cpu / frames * 1000:>10.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frames per second, latency and CPU per frame against the stand-in")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--width", type=int, default=4144)
+    parser.add_argument("--height", type=int, default=2822)
+    parser.add_argument("--exposure", type=float, default=0.01, help="Exposure in seconds")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds measured per format and binning")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0)
+    parser.add_argument("--roi-size", type=int, default=256, help="Side of the region of interest measured at bin 1")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv)
+
+    server, address = start_server(args)
+    try:
+        requester = CameraRequester(address, 0, print)
+        requester.start_capturing()
+        print(f"{'format':9} {'bin':>3} {'size':>10} {'fps':>7} {'latency p50':>12} {'latency max':>12} "
+              f"{'CPU/frame':>12}")
+        for name in formats:
+            for binning in binnings:
+                print(measure(requester, name, binning, args))
+        for name in ("RAW8", "RAW16"):
+            print(measure(requester, name, 1, args, args.roi_size))
+        requester.stop_capturing()
+    finally:
+        server.terminate()
+        server.wait()
+    del app
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import tracemalloc
+
+from benchmarks.end_to_end_benchmark import start_server
+from camera_requester import CameraRequester
+from display_stretch import DisplayStretch
+from frame_buffer_ring import FrameBufferRing
+from frame_compression import receive_frame
+from frame_statistics import frame_statistics
+from image_acquisition_widget import pixels_from_buffer, qimage_from_pixels
+
+
+# what receiving a frame into the buffer ring may allocate: headers and small objects, not a copy of the frame
+max_pooled_receive_bytes = 256 * 1024
+
+
+def receive(requester, buffer_ring):
+    response = requester.get_last_image(False)
+    if buffer_ring is None:
+        return response.content
+    content, _ = receive_frame(response, buffer_ring)
+    return content
+
+
+def decode(content, geometry, stretch):
+    pixels = pixels_from_buffer(content, geometry)
+    return qimage_from_pixels(pixels, stretch, frame_statistics(pixels))
+
+
+def traced_peak(function, *args):
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    result = function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    return result, peak - before
+
+
+def measure(requester, geometry, buffer_ring, frames, warmup):
+    stretch = DisplayStretch()
+    for _ in range(warmup):
+        decode(receive(requester, buffer_ring), geometry, stretch)
+
+    receive_peaks = []
+    decode_peaks = []
+    for _ in range(frames):
+        content, receive_peak = traced_peak(receive, requester, buffer_ring)
+        frame, decode_peak = traced_peak(decode, content, geometry, stretch)
+        receive_peaks.append(receive_peak)
+        decode_peaks.append(decode_peak)
+        del content, frame
+    return sum(receive_peaks) / frames, sum(decode_peaks) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure transient allocations per received raw frame")
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--width", type=int, default=4144)
+    parser.add_argument("--height", type=int, default=2822)
+    parser.add_argument("--format", default="RAW16", choices=["RAW8", "RAW16"])
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0)
+    args = parser.parse_args()
+
+    # the server runs in its own process, so tracemalloc only counts what the client allocates
+    server, address = start_server(args)
+    try:
+        requester = CameraRequester(address, 0, print)
+        requester.set_format(args.format)
+        geometry = requester.get_frame_geometry()
+        print(f"Frame: {geometry}, {geometry.frame_size_bytes() / 1e6:.1f} MB")
+
+        tracemalloc.start()
+        baseline = measure(requester, geometry, None, args.frames, args.warmup)
+        pooled = measure(requester, geometry, FrameBufferRing(), args.frames, args.warmup)
+        tracemalloc.stop()
+
+        print(f"{'MB allocated per frame':31} {'receive':>8} {'decode':>8}")
+        print(f"{'response.content + new buffers':31} {baseline[0] / 1e6:8.2f} {baseline[1] / 1e6:8.2f}")
+        print(f"{'readinto + buffer ring':31} {pooled[0] / 1e6:8.2f} {pooled[1] / 1e6:8.2f}")
+        assert pooled[0] < max_pooled_receive_bytes, f"Receiving into the buffer ring allocated {pooled[0]} bytes"
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from live_stack import LiveStack, default_clip_kappa
+from stand_in_server import star_field
+
+
+# ZWO ASI294MM Pro sensor size at bin 1
+sensor_size = (4144, 2822)
+modes = {"mean": (False, None), "mean, aligned": (True, None), "clipped, aligned": (True, default_clip_kappa)}
+
+
+def drift(i):
+    # a slow drift of one pixel every other frame, as with a poorly polar aligned mount
+    return i // 2, -(i // 2)
+
+
+def drifting_frames(w, h, count, is16b, rng):
+    maxv = 65535 if is16b else 255
+    field = star_field(w, h, maxv, rng)
+    frames = []
+    for i in range(count):
+        frame = np.roll(field, drift(i), axis=(0, 1)) + rng.normal(0, 0.02 * maxv, (h, w))
+        frames.append(np.clip(frame, 0, maxv).astype(np.uint16 if is16b else np.uint8))
+    return frames
+
+
+def measure(frames, align, clip_kappa):
+    stack = LiveStack(align=align, clip_kappa=clip_kappa)
+    stack.add(frames[0])
+    times = []
+    peaks = []
+    shifts = []
+    for frame in frames[1:]:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start_time = perf_counter()
+        stack.add(frame)
+        times.append(perf_counter() - start_time)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        shifts.append(stack.counters()["shift"])
+    return stack, times, peaks, shifts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory per frame added to the live stack")
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--raw8", action="store_true", help="Stack 8-bit instead of 16-bit frames")
+    args = parser.parse_args()
+
+    w, h = sensor_size
+    frames = drifting_frames(w, h, args.frames, not args.raw8, np.random.default_rng(0))
+    print(f"{args.frames} frames of {w}x{h} {'RAW8' if args.raw8 else 'RAW16'}")
+    print(f"{'mode':17} {'median':>9} {'max':>9} {'peak extra':>11} {'last shift':>11}")
+    tracemalloc.start()
+    for name, (align, clip_kappa) in modes.items():
+        stack, times, peaks, shifts = measure(frames, align, clip_kappa)
+        print(f"{name:17} {np.median(times) * 1000:>7.1f}ms {max(times) * 1000:>7.1f}ms "
+              f"{max(peaks) / 1024:>9.0f}KB {str(stack.counters()['shift']):>11}")
+        if align:
+            # every frame has to be stacked at the drift it was made with
+            expected = [drift(i) for i in range(1, len(frames))]
+            assert shifts == expected, f"{name}: recovered shifts {shifts}, expected {expected}"
+            assert stack.counters()["misaligned"] == 0, f"{name}: {stack.counters()['misaligned']} frames misaligned"
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+from timeit import repeat
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtCore import Qt
+
+from resizeable_label_with_image import ResizeableLabelWithImage, qimage_from_display_pixels
+
+
+# ZWO ASI294MM Pro sensor size at bin 1/2/4
+resolutions = {1: (4144, 2822), 2: (2072, 1411), 4: (1036, 705)}
+
+
+def best_of(callable_, repeats):
+    return min(repeat(callable_, number=1, repeat=repeats)) * 1000
+
+
+def full_pixmap(pixels, width, height):
+    # what the view did before: the whole frame converted to a pixmap and rescaled on every frame
+    return QPixmap(qimage_from_display_pixels(pixels)).scaled(width, height, Qt.KeepAspectRatio)
+
+
+def tiled(view, pixels, target, zoom=None):
+    view.set_pixels(pixels)
+    if zoom is not None:
+        view._set_view(zoom, (pixels.shape[1] / 2, pixels.shape[0] / 2))
+    view._pyramid.prepare(view._scale())
+    view.render(target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame to screen time of the image view at bin 1/2/4")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv)
+    view = ResizeableLabelWithImage(None)
+    view.resize(args.width, args.height)
+    target = QImage(args.width, args.height, QImage.Format_RGB32)
+    rng = np.random.default_rng(0)
+
+    print(f"{'bin':>3} {'size':>10} {'full pixmap':>12} {'tiled fit':>10} {'tiled 1:1':>10}")
+    for binning, (w, h) in resolutions.items():
+        pixels = rng.integers(0, 256, (h, w), dtype=np.uint8)
+        t_full = best_of(lambda: full_pixmap(pixels, args.width, args.height), args.repeats)
+        t_fit = best_of(lambda: tiled(view, pixels, target), args.repeats)
+        t_one = best_of(lambda: tiled(view, pixels, target, 1.0), args.repeats)
+        print(f"{binning:>3} {f'{w}x{h}':>10} {t_full:>10.1f}ms {t_fit:>8.1f}ms {t_one:>8.1f}ms")
+    del app
+
+
+if __name__ == '__main__':
+    main()
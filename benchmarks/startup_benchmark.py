@@ -0,0 +1,82 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# none of these should be needed before a camera is opened
+heavy_modules = ["numpy", "aiohttp", "matplotlib", "PIL"]
+
+show_script = """
+import sys
+from time import perf_counter
+start = perf_counter()
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+import main
+app = QApplication(sys.argv)
+window = main.MainWindow()
+
+def shown():
+    print(f"{perf_counter() - start:.4f}")
+    window._send_kill()
+    app.quit()
+
+QTimer.singleShot(0, shown)
+app.exec_()
+"""
+
+
+def child_env(platform):
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = platform
+    return env
+
+
+def import_times(platform):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=repo_dir,
+                            env=child_env(platform), capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def time_to_show(platform):
+    result = subprocess.run([sys.executable, "-c", show_script], cwd=repo_dir, env=child_env(platform),
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and launcher time-to-show")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--platform", default="offscreen", help="Qt platform plugin used by the child processes")
+    args = parser.parse_args()
+
+    rows = import_times(args.platform)
+    top_level = [r for r in rows if not r[0].startswith(" ")]
+    total_ms = sum(r[2] for r in top_level) / 1000
+    print(f"Importing main: {total_ms:.1f}ms in {len(rows)} modules")
+    print(f"{'module':40} {'self':>10} {'cumulative':>12}")
+    for name, self_us, cumulative_us in sorted(top_level, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{name:40} {self_us / 1000:>8.1f}ms {cumulative_us / 1000:>10.1f}ms")
+
+    loaded = {r[0].strip() for r in rows}
+    heavy = [m for m in heavy_modules if m in loaded]
+    print(f"Heavy modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+
+    times = [time_to_show(args.platform) for _ in range(args.runs)]
+    print(f"Launcher time-to-show over {args.runs} runs: median {statistics.median(times) * 1000:.0f}ms, "
+          f"min {min(times) * 1000:.0f}ms, max {max(times) * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+from timeit import repeat
+
+import numpy as np
+
+from display_stretch import DisplayStretch, stretch_modes
+from frame_statistics import frame_statistics
+
+
+# ZWO ASI294MM Pro sensor size at bin 1/2/4
+resolutions = {1: (4144, 2822), 2: (2072, 1411), 4: (1036, 705)}
+
+
+def synthetic_frame(w, h, is16b, rng):
+    maxv = 65535 if is16b else 255
+    frame = rng.normal(0.05 * maxv, 0.01 * maxv, (h, w))
+    return np.clip(frame, 0, maxv).astype(np.uint16 if is16b else np.uint8)
+
+
+def best_of(callable_, repeats):
+    return min(repeat(callable_, number=1, repeat=repeats)) * 1000
+
+
+def percentile_stretch(img):
+    # what the view did before: two np.percentile passes and float64 temporaries for every frame
+    a = np.percentile(img, 5)
+    b = np.percentile(img, 95)
+    normalized = (img - a) / (b - a)
+    return np.clip(256 * normalized, 0, 255).astype(np.uint8)
+
+
+def display_stretch(stretch, frame, max_pixels=0):
+    return stretch.apply(frame, frame_statistics(frame, max_pixels))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare percentile stretch against histogram stretch")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--subsample", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'format':7} {'bin':>3} {'size':>10} {'percentile':>12} {'histogram':>12} "
+          f"{'hist/sub' + str(args.subsample):>12} {'speedup':>8} {'max diff':>9}")
+    for is16b in (False, True):
+        for binning, (w, h) in resolutions.items():
+            frame = synthetic_frame(w, h, is16b, rng)
+            # the linear mode the view uses by default, statistics included as on the decode thread
+            stretch = DisplayStretch("linear")
+            max_pixels = w * h // args.subsample ** 2
+            reference = percentile_stretch(frame).astype(np.int16)
+            max_diff = int(np.abs(reference - display_stretch(stretch, frame)).max())
+
+            t_reference = best_of(lambda: percentile_stretch(frame), args.repeats)
+            t_fast = best_of(lambda: display_stretch(stretch, frame), args.repeats)
+            t_sub = best_of(lambda: display_stretch(stretch, frame, max_pixels), args.repeats)
+            print(f"{'RAW16' if is16b else 'RAW8':7} {binning:>3} {f'{w}x{h}':>10} {t_reference:>10.1f}ms "
+                  f"{t_fast:>10.1f}ms {t_sub:>10.1f}ms {t_reference / t_fast:>7.1f}x {max_diff:>9}")
+
+    print()
+    print(f"{'mode':9} {'format':7} {'bin':>3} {'LUT apply':>10}")
+    for is16b in (False, True):
+        for binning, (w, h) in resolutions.items():
+            frame = synthetic_frame(w, h, is16b, rng)
+            statistics = frame_statistics(frame)
+            for mode in stretch_modes:
+                stretch = DisplayStretch(mode)
+                t_apply = best_of(lambda: stretch.apply(frame, statistics), args.repeats)
+                print(f"{mode:9} {'RAW16' if is16b else 'RAW8':7} {binning:>3} {t_apply:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
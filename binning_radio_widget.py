@@ -15,9 +15,13 @@ class BinningRadio(QWidget):
         self._radios = []
         label = QLabel("Binning:")
         label.setMaximumSize(100, 20)
+        self._layout.addWidget(label, 0, 0)
 
-        possible_bins = self._requester.get_possible_binning()
+        self.setLayout(self._layout)
+        self.setMaximumSize(300, 50)
+        self._requester.call(self._requester.get_possible_binning(), self._add_radios)
 
+    def _add_radios(self, possible_bins):
         for index, binning in enumerate(possible_bins):
             logger.debug(f"Found binning: x{binning}")
             radiobutton = QRadioButton(f"x{binning}", self)
@@ -28,17 +32,17 @@ class BinningRadio(QWidget):
                 radiobutton.setChecked(True)
 
             self._layout.addWidget(radiobutton, 0, index + 1)
-        self._layout.addWidget(label, 0, 0)
 
-        self.setLayout(self._layout)
-        self.setMaximumSize(300, 50)
+    @staticmethod
+    def required_properties():
+        return ["get_maxbinx"]
 
     def _changed_binning(self):
         radio_button = self.sender()
         if radio_button.isChecked():
             bin_value = int(radio_button.text().split("x")[-1])
             logger.debug(f"Chosen binning: {bin_value}")
-            self._requester.set_binning(bin_value)
+            self._requester.call(self._requester.set_binning(bin_value))
 
     def _refresh_impl(self):
         pass  # TODO when get_binx implemented
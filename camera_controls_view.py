@@ -3,25 +3,42 @@ from gain_setter_widget import GainSetter
 from binning_radio_widget import BinningRadio
 from offset_dial_widget import OffsetDial
 from format_chooser_widget import FormatChooser
+from stretch_chooser_widget import StretchChooser
 from temperature_control_widget import TemperatureControl
 from image_acquisition_widget import ImageAcquisition
 from resizeable_label_with_image import ResizeableLabelWithImage
 from camera_requester import CameraRequester
-from canvas_widget import CanvasWidget
-from utils import start_interval_polling
+from async_camera_requester import AsyncCameraRequester
+from histogram_widget import HistogramWidget
+from frame_history_widget import FrameHistoryWidget
+from frame_history import default_history_cap_mb
+from frame_statistics import default_stats_max_pixels
+from polling_scheduler import PollingScheduler
 from general_settings_widget import GeneralSettings
+from event_loop_thread import EventLoopThread, QtCallbackDispatcher
+from diagnostics_widget import DiagnosticsWidget
 
 
-from PyQt5.QtWidgets import QHBoxLayout, QWidget, QVBoxLayout, QPushButton, QTabWidget
+from PyQt5.QtWidgets import QHBoxLayout, QWidget, QVBoxLayout, QPushButton, QTabWidget, QLabel
 
 
 import logging
-from threading import Event
+from time import monotonic
 
 
 logger = logging.getLogger(__name__)
 
 
+# refreshes of panels hidden in the dashboard are this many times less frequent
+background_slowdown = 5
+
+
+def get_widget_required_properties(w):
+    if hasattr(w, "required_properties") and callable(getattr(w, "required_properties")):
+        return w.required_properties()
+    return []
+
+
 def get_widget_refresh_rate_or_none(w):
     logger.debug(f"Checking for refresh rate in {w}")
     if hasattr(w, "refresh_rate_s") and callable(getattr(w, "refresh_rate_s")):
@@ -29,42 +46,145 @@ def get_widget_refresh_rate_or_none(w):
     return None
 
 
+class PendingWidget:
+    def __init__(self, layout, placeholder, ctor, factory, attribute, depends_on):
+        self.layout = layout
+        self.placeholder = placeholder
+        self.ctor = ctor
+        self.factory = factory
+        self.attribute = attribute
+        self.depends_on = depends_on
+        self.data_ready = False
+
+
 class CameraControlsView(QWidget):
-    def __init__(self, config, ip, camera_index, camera_name, error_prompt, kill_event):
+    def __init__(self, config, ip, camera_index, camera_name, error_prompt, kill_event, pool=None, scheduler=None,
+                 loop_thread: EventLoopThread = None):
         super(CameraControlsView, self).__init__()
+        self._started = monotonic()
         self._config = config
         self._camera_name = camera_name
         self._kill_event = kill_event
 
-        self._requester = CameraRequester(ip, camera_index, error_prompt)
+        self._requester = CameraRequester(ip, camera_index, error_prompt, pool)
+        self._scheduler = scheduler if scheduler is not None else PollingScheduler(kill_event)
+        if loop_thread is None:
+            loop_thread = EventLoopThread()
+            loop_thread.stop_on(kill_event)
+        self._loop_thread = loop_thread
+        # camera settings are read and written on the asyncio loop, frames still come through the blocking requester
+        self._async_requester = AsyncCameraRequester(self._requester, error_prompt, loop_thread)
         self._refreshable = []
         self._auto_refresh = []
+        self._background = False
         self._continuous_polling = False
-        self._polling_event = Event()
+        self._dispatcher = QtCallbackDispatcher()
+        self._pending_widgets = []
+        self._interactive = False
+        self._general_settings = None
+        self._format_chooser = None
+        self._stretch_chooser = None
+        self._image_acquisition = None
         self._prepare_ui()
 
     def __del__(self):
-        if self._general_settings.should_turn_off_capture_on_exit():
+        if self._general_settings is not None and self._general_settings.should_turn_off_capture_on_exit():
             self._requester.stop_capturing()
         logger.debug("__del__ camera controls view")
 
     def close(self):
         logger.debug("Closing camera controls view")
+        for task, _ in self._auto_refresh:
+            task.cancel()
+        if self._image_acquisition is not None:
+            self._image_acquisition.stop()
+        self._async_requester.call(self._async_requester.close())
+        self._requester.close()
+
+    def camera_name(self):
+        return self._camera_name
+
+    def set_background(self, background):
+        if background == self._background:
+            return
+        self._background = background
+        for task, refresh_rate in self._auto_refresh:
+            task.set_interval(refresh_rate * background_slowdown if background else refresh_rate)
+        if self._image_acquisition is not None:
+            self._image_acquisition.set_background(background)
 
     def _add_auto_task(self, refresh_rate, callback):
-        new_refresh_event = Event()
-        self._auto_refresh.append(new_refresh_event)
-        start_interval_polling(new_refresh_event, callback, refresh_rate, self._kill_event)
-
-    def _add_custom_widget(self, layout, ctor, *args):
-        widget = ctor(*args)
+        # widget refreshes may take a while on a slow link, so the next one waits for the previous to finish
+        interval = refresh_rate * background_slowdown if self._background else refresh_rate
+        task = self._scheduler.schedule(callback, interval, fixed_rate=False)
+        self._auto_refresh.append((task, refresh_rate))
+
+    def _changed_tab(self, index):
+        # all auto refreshed widgets live in the camera controls tab
+        paused = self._tabs.widget(index) is not self._camera_controls_tab
+        for task, _ in self._auto_refresh:
+            task.set_paused(paused)
+
+    def _fetch_then(self, properties, callback, force=False):
+        # properties are fetched on the asyncio loop, callback runs on the GUI thread once they arrive
+        def on_fetched(future):
+            exception = None if future.cancelled() else future.exception()
+            if exception is not None:
+                logger.error(f"Fetching {properties} failed: {exception}")
+            self._dispatcher.call_soon(lambda _: callback(), None)
+
+        self._loop_thread.submit(self._async_requester.prefetch(properties, force)).add_done_callback(on_fetched)
+
+    def _add_custom_widget(self, layout, ctor, *args, attribute=None, depends_on=()):
+        self._add_widget_when_ready(layout, ctor, lambda: ctor(*args), attribute, depends_on)
+
+    def _add_widget_when_ready(self, layout, ctor, factory, attribute=None, depends_on=()):
+        placeholder = QLabel(f"Loading {ctor.__name__}...")
+        layout.addWidget(placeholder)
+        pending = PendingWidget(layout, placeholder, ctor, factory, attribute, depends_on)
+        self._pending_widgets.append(pending)
+
+        properties = get_widget_required_properties(ctor)
+        if not properties:
+            # created together with the other ready widgets at the end of _prepare_ui
+            pending.data_ready = True
+            return
+
+        def on_data_ready():
+            pending.data_ready = True
+            self._create_ready_widgets()
+
+        self._fetch_then(properties, on_data_ready)
+
+    def _create_ready_widgets(self):
+        created = True
+        while created:
+            created = False
+            for pending in list(self._pending_widgets):
+                if not pending.data_ready or any(getattr(self, d) is None for d in pending.depends_on):
+                    continue
+                self._pending_widgets.remove(pending)
+                self._create_widget(pending)
+                created = True
+        if not self._pending_widgets and not self._interactive:
+            self._interactive = True
+            logger.info(f"Camera view for {self._camera_name} interactive after {monotonic() - self._started:.2f}s")
+
+    def _create_widget(self, pending: PendingWidget):
+        # the data is in the requester cache by now, so the constructor does not block on the network
+        widget = pending.factory()
         rr = get_widget_refresh_rate_or_none(widget)
         if rr is not None:
             self._add_auto_task(rr, widget.refresh)
 
         self._refreshable.append(widget)
-        layout.addWidget(widget)
-        return widget
+        pending.layout.replaceWidget(pending.placeholder, widget)
+        pending.placeholder.deleteLater()
+        if pending.attribute is not None:
+            setattr(self, pending.attribute, widget)
+        if widget is self._image_acquisition:
+            widget.set_background(self._background)
+        logger.debug(f"{pending.ctor.__name__} ready after {monotonic() - self._started:.2f}s")
 
     def _prepare_ui(self):
         self._main_layout = QVBoxLayout()
@@ -80,23 +200,24 @@ class CameraControlsView(QWidget):
 
         self._tabs.addTab(self._camera_controls_tab, "Camera controls")
         self._tabs.addTab(self._image_controls_tab, "Image controls")
+        self._tabs.addTab(DiagnosticsWidget(self._requester.metrics()), "Diagnostics")
 
         general_stuff = QHBoxLayout()
-        self._general_settings: GeneralSettings = self._add_custom_widget(
-            general_stuff, GeneralSettings, self._requester)
+        self._add_custom_widget(general_stuff, GeneralSettings, self._requester, attribute="_general_settings")
 
         exp_gain_off = QHBoxLayout()
-        self._add_custom_widget(exp_gain_off, ExposureDial, self._requester)
-        self._add_custom_widget(exp_gain_off, GainSetter, self._requester)
-        self._add_custom_widget(exp_gain_off, OffsetDial, self._requester)
+        self._add_custom_widget(exp_gain_off, ExposureDial, self._async_requester)
+        self._add_custom_widget(exp_gain_off, GainSetter, self._async_requester)
+        self._add_custom_widget(exp_gain_off, OffsetDial, self._async_requester)
 
         format_bin = QHBoxLayout()
-        self._format_chooser: FormatChooser = self._add_custom_widget(format_bin, FormatChooser,
-                                                                      self._requester, self._read_default_format())
-        self._add_custom_widget(format_bin, BinningRadio, self._requester, self._read_default_bin())
+        self._add_custom_widget(format_bin, FormatChooser, self._async_requester, self._read_default_format(),
+                                attribute="_format_chooser")
+        self._add_custom_widget(format_bin, StretchChooser, self._read_default_stretch(), attribute="_stretch_chooser")
+        self._add_custom_widget(format_bin, BinningRadio, self._async_requester, self._read_default_bin())
 
         temp_control = QHBoxLayout()
-        self._add_custom_widget(temp_control, TemperatureControl, self._requester)
+        self._add_custom_widget(temp_control, TemperatureControl, self._async_requester)
 
         refresh_layout = QHBoxLayout()
         refresh_button = QPushButton("Refresh parameters", self)
@@ -105,15 +226,20 @@ class CameraControlsView(QWidget):
 
         self._image_label = ResizeableLabelWithImage(self)
 
-        image_histogram = CanvasWidget()
+        image_histogram = HistogramWidget()
         image_histogram.setMinimumSize(200, 200)
         image_histogram.setMaximumSize(500, 500)
 
+        frame_history = FrameHistoryWidget(self._image_label, self._read_default_history_cap_mb())
+        frame_history.setMaximumWidth(500)
+
         acquisition_layout = QHBoxLayout()
-        self._add_custom_widget(acquisition_layout,
-                                ImageAcquisition,
-                                self._requester, self._format_chooser, self._image_label, image_histogram,
-                                self._kill_event)
+        self._add_widget_when_ready(
+            acquisition_layout, ImageAcquisition,
+            lambda: ImageAcquisition(self._requester, self._format_chooser, self._stretch_chooser, self._image_label,
+                                     image_histogram, frame_history, self._scheduler, self._kill_event,
+                                     self._read_default_stats_max_pixels()),
+            attribute="_image_acquisition", depends_on=("_format_chooser", "_stretch_chooser"))
 
         camera_controls_layout.addLayout(general_stuff)
         camera_controls_layout.addLayout(exp_gain_off)
@@ -123,16 +249,25 @@ class CameraControlsView(QWidget):
         camera_controls_layout.addLayout(acquisition_layout)
 
         image_controls_layout.addWidget(image_histogram)
+        image_controls_layout.addWidget(frame_history)
 
         image_layout = QHBoxLayout()
         image_layout.addWidget(self._image_label)
 
+        self._tabs.currentChanged.connect(self._changed_tab)
         self._main_layout.addWidget(self._tabs)
         self._main_layout.addLayout(image_layout)
         self.setLayout(self._main_layout)
+        self._create_ready_widgets()
 
     def _refresh_all(self):
-        list(map(lambda x: x.refresh(), self._refreshable))
+        # every widget refetches its own properties concurrently and refreshes as soon as they are in
+        for widget in self._refreshable:
+            properties = get_widget_required_properties(widget)
+            if properties:
+                self._fetch_then(properties, widget.refresh, force=True)
+            else:
+                widget.refresh()
 
     def _read_default_camera_setting(self, setting_name, returned_if_not_found):
         defaults = self._config.get("camera_defaults", {})
@@ -150,3 +285,12 @@ class CameraControlsView(QWidget):
 
     def _read_default_format(self):
         return self._read_default_camera_setting("default_format", "RAW8")
+
+    def _read_default_stretch(self):
+        return self._read_default_camera_setting("default_stretch", "linear")
+
+    def _read_default_history_cap_mb(self):
+        return int(self._read_default_camera_setting("history_cap_mb", default_history_cap_mb))
+
+    def _read_default_stats_max_pixels(self):
+        return int(self._read_default_camera_setting("stats_max_pixels", default_stats_max_pixels))
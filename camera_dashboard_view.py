@@ -0,0 +1,79 @@
+from launcher_view import LauncherView
+from connection_pool import ConnectionPool
+from polling_scheduler import PollingScheduler
+from event_loop_thread import EventLoopThread
+
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTabWidget
+
+
+import logging
+from threading import Event
+
+
+logger = logging.getLogger(__name__)
+
+
+class CameraDashboard(QWidget):
+    def __init__(self, config, error_prompt, kill_event: Event, pool: ConnectionPool, scheduler: PollingScheduler,
+                 loop_thread: EventLoopThread = None):
+        super(CameraDashboard, self).__init__()
+        self._config = config
+        self._error_prompt = error_prompt
+        self._kill_event = kill_event
+        # every panel talks through the same pool and is polled by the same scheduler, whatever its host
+        self._pool = pool
+        self._scheduler = scheduler
+        self._loop_thread = loop_thread
+        self._panels = {}
+
+        self._tabs = QTabWidget()
+        self._tabs.setTabsClosable(True)
+        self._tabs.tabCloseRequested.connect(self._close_tab)
+        self._tabs.currentChanged.connect(self._changed_tab)
+
+        self._launcher_view = LauncherView(self._config, self.add_camera, self._error_prompt, self._pool, loop_thread)
+        self._tabs.addTab(self._launcher_view, "Add camera")
+        # the launcher tab stays, only camera panels can be closed
+        self._tabs.tabBar().setTabButton(0, self._tabs.tabBar().RightSide, None)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self._tabs)
+        self.setLayout(layout)
+
+    def panels(self):
+        return list(self._panels.values())
+
+    def add_camera(self, ip, camera_index, camera_name):
+        key = (ip, camera_index)
+        if key in self._panels:
+            logger.debug(f"Camera {camera_name} at {ip} already has a panel")
+            self._tabs.setCurrentWidget(self._panels[key])
+            return
+        logger.debug(f"Adding panel for camera {camera_name} at {ip}")
+        # the camera view pulls in numpy and all image handling, which the launcher alone does not need
+        from camera_controls_view import CameraControlsView
+        panel = CameraControlsView(self._config, ip, camera_index, camera_name, self._error_prompt,
+                                   self._kill_event, self._pool, self._scheduler, self._loop_thread)
+        self._panels[key] = panel
+        index = self._tabs.addTab(panel, f"{camera_name} ({ip})")
+        self._tabs.setCurrentIndex(index)
+
+    def _close_tab(self, index):
+        panel = self._tabs.widget(index)
+        if panel is self._launcher_view:
+            return
+        logger.debug(f"Closing panel for {panel.camera_name()}")
+        self._tabs.removeTab(index)
+        self._panels = {key: p for key, p in self._panels.items() if p is not panel}
+        panel.close()
+        panel.deleteLater()
+
+    def _changed_tab(self, index):
+        current = self._tabs.widget(index)
+        for panel in self._panels.values():
+            panel.set_background(panel is not current)
+
+    def close(self):
+        for panel in self._panels.values():
+            panel.close()
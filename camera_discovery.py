@@ -0,0 +1,101 @@
+import asyncio
+import ipaddress
+import logging
+
+import aiohttp
+
+import camera_requester
+from camera_requester import server_url
+from event_loop_thread import EventLoopThread
+
+
+logger = logging.getLogger(__name__)
+
+
+default_probe_timeout_s = 0.5
+default_concurrency = 256
+
+
+class DiscoveredServer:
+    def __init__(self, address, cameras):
+        self.address = address
+        self.cameras = cameras
+
+    def __repr__(self):
+        return f"{self.address} ({len(self.cameras)} camera(s))"
+
+
+def address_for(host, port):
+    return host if port == camera_requester.port_for_cameras else f"{host}:{port}"
+
+
+def discovery_targets(saved_ips, subnet=None, ports=None):
+    ports = ports or [camera_requester.port_for_cameras]
+    hosts = [ip for ip in saved_ips if ip]
+    if subnet:
+        hosts += [str(h) for h in ipaddress.ip_network(subnet, strict=False).hosts()]
+    addresses = []
+    for host in hosts:
+        for port in ports:
+            address = address_for(host, int(port))
+            if address not in addresses:
+                addresses.append(address)
+    return addresses
+
+
+class CameraDiscovery:
+    def __init__(self, loop_thread: EventLoopThread, timeout_s=default_probe_timeout_s,
+                 concurrency=default_concurrency):
+        self._loop_thread = loop_thread
+        self._timeout_s = timeout_s
+        self._concurrency = concurrency
+        self._future = None
+
+    @classmethod
+    def from_config(cls, config, loop_thread: EventLoopThread):
+        settings = config.get("discovery", {})
+        return cls(loop_thread, timeout_s=float(settings.get("timeout_s", default_probe_timeout_s)),
+                   concurrency=int(settings.get("concurrency", default_concurrency)))
+
+    async def _probe(self, session, semaphore, address):
+        async with semaphore:
+            try:
+                async with session.get(f"{server_url(address)}/cameras_list") as r:
+                    if r.status != 200:
+                        return None
+                    cameras = (await r.json(content_type=None))["cameras"]
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError):
+                return None
+        logger.debug(f"Discovered camera server at {address}: {cameras}")
+        return DiscoveredServer(address, cameras)
+
+    async def discover(self, addresses, on_found=None):
+        logger.info(f"Probing {len(addresses)} addresses for camera servers")
+        semaphore = asyncio.Semaphore(self._concurrency)
+        # short connect timeouts keep unanswered hosts from holding up the scan
+        timeout = aiohttp.ClientTimeout(total=2 * self._timeout_s, sock_connect=self._timeout_s)
+        connector = aiohttp.TCPConnector(limit=self._concurrency, force_close=True)
+        found = []
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            for probe in asyncio.as_completed([self._probe(session, semaphore, a) for a in addresses]):
+                server = await probe
+                if server is not None:
+                    found.append(server)
+                    if on_found is not None:
+                        on_found(server)
+        logger.info(f"Discovery finished, found {len(found)} camera server(s)")
+        return found
+
+    def start(self, addresses, on_found, on_finished):
+        self.cancel()
+        # results are handed to the GUI thread one by one, as hosts respond
+        report = lambda server: self._loop_thread.call_in_qt(on_found, server)
+        self._future = self._loop_thread.submit_to_qt(self.discover(addresses, report), on_finished)
+        return self._future
+
+    def is_running(self):
+        return self._future is not None and not self._future.done()
+
+    def cancel(self):
+        if self.is_running():
+            self._future.cancel()
@@ -1,5 +1,12 @@
 import logging
+from threading import Lock
+from time import perf_counter
 import requests
+from connection_pool import ConnectionPool, ConnectionPoolClosed
+from camera_state_cache import CameraStateCache
+from frame_geometry import FrameGeometry, FrameRegion, roi_param
+from frame_freshness import wait_after_param, wait_timeout_param
+from metrics import Metrics
 
 
 logger = logging.getLogger(__name__)
@@ -11,10 +18,30 @@ def null_handler(s):
     pass
 
 
-def handle_request_call(request_call, full_url, error_prompt):
+def server_url(address):
+    # servers on a port other than the default are addressed as "ip:port"
+    if ":" in address:
+        return f"http://{address}"
+    return f"http://{address}:{port_for_cameras}"
+
+
+def endpoint_of(url):
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def response_size(response):
+    # streamed bodies are not read yet, so the announced length is used rather than the content
+    return int(response.headers.get("Content-Length", 0))
+
+
+def handle_request_call(request_call, full_url, error_prompt, accepted_status_codes=(200,)):
     logger.debug(f"Trying to reach {full_url}...")
     try:
         response = request_call()
+    except ConnectionPoolClosed as e:
+        logger.debug(e)
+        return None
+
     except requests.exceptions.Timeout:
         logger.error(f"Connection to {full_url} timed out!")
         error_prompt(f"Connection to {full_url} timed out!")
@@ -26,44 +53,90 @@ def handle_request_call(request_call, full_url, error_prompt):
         return None
 
     logger.debug(f"Acquired response from {full_url}")
-    if response.status_code != 200:
+    if response.status_code not in accepted_status_codes:
         if response.status_code == 422:
             logger.warning(response.content)
         logger.error(f"HTTP error encountered while getting from {full_url}: "
                      f"status code={response.status_code}")
         error_prompt(f"HTTP error encountered while getting from {full_url}:\n"
                      f"status code={response.status_code}")
+        # streamed responses are not read by anyone, so their connection is released here
+        response.close()
         return None
     return response
 
 
-def standalone_get_request(url, error_prompt=null_handler):
+def standalone_get_request(url, error_prompt=null_handler, pool: ConnectionPool = None, accepted_status_codes=(200,),
+                           **kwargs):
     def request_call():
-        return requests.get(url, timeout=5)
+        if pool is None:
+            kwargs.setdefault("timeout", 5)
+            return requests.get(url, **kwargs)
+        return pool.get(url, **kwargs)
 
-    return handle_request_call(request_call, url, error_prompt)
+    return handle_request_call(request_call, url, error_prompt, accepted_status_codes)
 
 
-def standalone_post_request(url, headers, data, error_prompt=null_handler):
+def standalone_post_request(url, headers, data, error_prompt=null_handler, pool: ConnectionPool = None):
     logger.debug(f"Trying to POST on {url}")
 
     def request_call():
-        return requests.post(url, headers=headers, json=data, timeout=5)
+        if pool is None:
+            return requests.post(url, headers=headers, json=data, timeout=5)
+        return pool.post(url, headers=headers, json=data)
 
     return handle_request_call(request_call, url, error_prompt)
 
 
 class CameraRequester:
-    def __init__(self, ip, camera_index, error_prompt):
+    def __init__(self, ip, camera_index, error_prompt, pool: ConnectionPool = None):
         self._ip = ip
         self._camera_index = camera_index
         self._error_prompt = error_prompt
+        self._pool = pool if pool is not None else ConnectionPool()
+        self._batch_supported = True
+        self._metrics = Metrics()
+        self._state_cache = CameraStateCache(self._fetch_pair_success_and_value, self._fetch_batch)
+        self._frame_geometry = None
+        self._frame_geometry_lock = Lock()
+        self._camera_roi = None
+
+    def pool(self):
+        return self._pool
+
+    def metrics(self):
+        return self._metrics
+
+    def state_cache(self):
+        return self._state_cache
+
+    def close(self):
+        self._state_cache.close()
+
+    def camera_url(self, endpoint):
+        return self._camera_url(endpoint)
+
+    def _timed(self, full_url, request):
+        start_time = perf_counter()
+        response = request()
+        ok = response is not None
+        self._metrics.record_request(endpoint_of(full_url), perf_counter() - start_time,
+                                     response_size(response) if ok else 0, ok)
+        return response
+
+    def _camera_url(self, endpoint):
+        return f"{server_url(self._ip)}/camera/{self._camera_index}/{endpoint}"
+
+    def _get_request(self, full_url, **kwargs):
+        return self._timed(full_url, lambda: standalone_get_request(full_url, self._error_prompt, self._pool,
+                                                                    **kwargs))
 
-    def _get_request(self, full_url):
-        return standalone_get_request(full_url, self._error_prompt)
+    def _post_request(self, full_url, headers, data):
+        return self._timed(full_url, lambda: standalone_post_request(full_url, headers, data, self._error_prompt,
+                                                                     self._pool))
 
     def _regular_get_url(self, what_to_get):
-        url = f"http://{self._ip}:{port_for_cameras}/camera/{self._camera_index}/{what_to_get}"
+        url = self._camera_url(what_to_get)
         logger.debug(f"Using URL for next request: {url}")
         return self._get_request(url)
 
@@ -72,12 +145,16 @@ class CameraRequester:
         return self._custom_value_set_url(what_to_set, {"value": value_str})
 
     def _custom_value_set_url(self, what_to_set, value_dict):
-        url = f"http://{self._ip}:{port_for_cameras}/camera/{self._camera_index}/{what_to_set}"
+        self._state_cache.invalidate_for_setter(what_to_set)
+        url = self._camera_url(what_to_set)
         headers = {"Content-Type": "application/json; charset=utf-8"}
         data = value_dict
         logger.debug(f"Sending POST with data: {data}")
-        response = standalone_post_request(url, headers, data, self._error_prompt)
-        logger.debug(f"Acquired response from POST: {response.content}")
+        response = self._post_request(url, headers, data)
+        # a refresh running during the POST may have cached the old value again
+        self._state_cache.invalidate_for_setter(what_to_set)
+        if response is not None:
+            logger.debug(f"Acquired response from POST: {response.content}")
         return response
 
     # def _get_success_and_dict(self, endpoint):
@@ -91,7 +168,7 @@ class CameraRequester:
     #         return False, None
     #     return True, value
 
-    def _get_pair_success_and_value(self, endpoint):
+    def _fetch_pair_success_and_value(self, endpoint):
         response = self._regular_get_url(endpoint)
         if response is None:
             return False, None
@@ -102,6 +179,44 @@ class CameraRequester:
             return False, None
         return True, value
 
+    def _fetch_batch(self, endpoints):
+        if not self._batch_supported:
+            return None
+        url = self._camera_url("get_properties")
+        logger.debug(f"Fetching batch of properties from {url}: {endpoints}")
+        start_time = perf_counter()
+        try:
+            response = self._pool.get(url, params={"names": ",".join(endpoints)})
+        except Exception as e:
+            logger.warning(f"Batched fetch from {url} failed: {e}")
+            self._metrics.record_request("get_properties", perf_counter() - start_time, ok=False)
+            return None
+        self._metrics.record_request("get_properties", perf_counter() - start_time, response_size(response),
+                                     response.status_code == 200)
+
+        if response.status_code in (404, 405):
+            logger.info(f"Camera server at {self._ip} does not support batched fetch")
+            self._batch_supported = False
+            return None
+        if response.status_code != 200:
+            logger.warning(f"Batched fetch from {url} returned status code={response.status_code}")
+            return None
+        try:
+            values = response.json()["values"]
+        except Exception as e:
+            logger.error(e)
+            return None
+        return {e: values[e] for e in endpoints if e in values}
+
+    def _get_pair_success_and_value(self, endpoint):
+        return self._state_cache.get(endpoint)
+
+    def prefetch(self, endpoints, force=False):
+        self._state_cache.prefetch(endpoints, force)
+
+    def cached_value(self, endpoint):
+        return self._state_cache.peek(endpoint)
+
     def custom_request(self, url):
         return self._get_request(url)
 
@@ -117,13 +232,19 @@ class CameraRequester:
     def stop_saving(self):
         return self._regular_set_url("stop_saving")
 
+    def binning_changed(self):
+        # subframe coordinates are in binned pixels, so a new binning starts from the full frame again
+        self._camera_roi = None
+        self.invalidate_frame_geometry()
+
     def set_binning(self, value):
-        url = f"http://{self._ip}:{port_for_cameras}/camera/{self._camera_index}/set_binx"
-        headers = {"Content-Type": "application/json; charset=utf-8"}
-        data = {"value": str(value)}
-        return standalone_post_request(url, headers, data, self._error_prompt)
+        self.binning_changed()
+        response = self._regular_set_url("set_binx", value)
+        self.binning_changed()
+        return response
 
     def set_format(self, value):
+        self.invalidate_frame_geometry()
         return self._regular_set_url("set_readoutmode_str", value)
 
     def set_gain(self, value):
@@ -141,14 +262,42 @@ class CameraRequester:
     def get_formats(self):
         return self._get_pair_success_and_value("get_readoutmodes")
 
-    def get_last_image(self, send_as_jpg: bool):
-        url = f"http://{self._ip}:{port_for_cameras}/camera/{self._camera_index}/get_last_image"
+    def get_last_image(self, send_as_jpg: bool, compression=None, etag=None, wait_after=None, wait_timeout_s=None,
+                       roi: FrameRegion = None):
+        url = self._camera_url("get_last_image")
         logger.debug(f"Trying to get last image from {url}")
-
-        def request_call():
-            return requests.get(url, params={"format": "jpg" if send_as_jpg else "raw"}, timeout=5)
-
-        return handle_request_call(request_call, url, self._error_prompt)
+        params = {"format": "jpg" if send_as_jpg else "raw"}
+        if roi is not None:
+            # the server crops the frame, so only the region crosses the network
+            params[roi_param] = roi.as_param()
+        headers = {}
+        kwargs = {}
+        if etag is not None:
+            # the server answers 304 without a body when the frame did not change
+            headers["If-None-Match"] = etag
+        if wait_after is not None:
+            params[wait_after_param] = str(wait_after)
+            params[wait_timeout_param] = str(wait_timeout_s)
+            kwargs["timeout"] = (self._pool.connect_timeout(), self._pool.timeout_for(url) + wait_timeout_s)
+        if send_as_jpg:
+            return self._get_request(url, params=params, headers=headers, accepted_status_codes=(200, 304), **kwargs)
+        # raw frames are read (and decompressed) straight into frame buffers, so the body is not preloaded
+        if compression:
+            # imported here so that the launcher does not load numpy along with the requester
+            from frame_compression import accept_compression_header
+            headers[accept_compression_header] = ", ".join(compression)
+        return self._get_request(url, params=params, headers=headers, stream=True, accepted_status_codes=(200, 304),
+                                 **kwargs)
+
+    def open_frame_stream(self, send_as_jpg: bool):
+        url = self._camera_url("stream_frames")
+        logger.debug(f"Opening frame stream from {url}")
+        try:
+            return self._pool.get(url, params={"format": "jpg" if send_as_jpg else "raw"}, stream=True,
+                                  timeout=(self._pool.connect_timeout(), self._pool.timeout_for(url)))
+        except Exception as e:
+            logger.warning(f"Could not open frame stream from {url}: {e}")
+            return None
 
     def get_current_format(self):
         return self._get_pair_success_and_value("get_readoutmode_str")
@@ -192,8 +341,7 @@ class CameraRequester:
 
     def get_resolution(self):
         logger.debug(f"Trying to get camera resolution...")
-        logger.debug(f"X...")
-
+        self.prefetch(["get_numx", "get_numy"])
         is_okx, numx = self._get_pair_success_and_value("get_numx")
         is_oky, numy = self._get_pair_success_and_value("get_numy")
 
@@ -212,3 +360,59 @@ class CameraRequester:
             return []
         logger.debug(f"Max possible bin is {maxbin}")
         return list(range(1, maxbin+1))
+
+    def get_binning(self):
+        return self._get_pair_success_and_value("get_binx")
+
+    def _fetch_frame_geometry(self):
+        self.prefetch(["get_numx", "get_numy", "get_readoutmode_str", "get_binx"], force=True)
+        is_okx, numx = self._get_pair_success_and_value("get_numx")
+        is_oky, numy = self._get_pair_success_and_value("get_numy")
+        is_okf, readout_format = self._get_pair_success_and_value("get_readoutmode_str")
+        is_okb, binning = self.get_binning()
+        if not (is_okx and is_oky and is_okf and is_okb):
+            return None
+        return FrameGeometry.from_camera_values(numx, numy, readout_format, int(binning))
+
+    def get_frame_geometry(self):
+        with self._frame_geometry_lock:
+            if self._frame_geometry is None:
+                self._frame_geometry = self._fetch_frame_geometry()
+                logger.debug(f"Fetched frame geometry: {self._frame_geometry}")
+            return self._frame_geometry
+
+    def camera_roi(self):
+        return self._camera_roi
+
+    def _set_subframe(self, region: FrameRegion):
+        self.invalidate_frame_geometry()
+        for setter, value in zip(["set_startx", "set_starty", "set_numx", "set_numy"], region.as_tuple()):
+            response = self._regular_set_url(setter, value)
+            if response is None:
+                return False
+        return True
+
+    def set_camera_roi(self, region: FrameRegion):
+        # the camera itself reads out only the region, which also shortens readout on real sensors
+        logger.debug(f"Setting camera ROI to {region}")
+        if not self._set_subframe(region):
+            return False
+        self._camera_roi = region
+        return True
+
+    def clear_camera_roi(self):
+        # the binning is read from the camera, it may have been set by another client or before this one started
+        self.prefetch(["get_cameraxsize", "get_cameraysize", "get_binx"])
+        is_okx, width = self._get_pair_success_and_value("get_cameraxsize")
+        is_oky, height = self._get_pair_success_and_value("get_cameraysize")
+        is_okb, binning = self.get_binning()
+        if not (is_okx and is_oky and is_okb):
+            return False
+        logger.debug(f"Clearing camera ROI at bin {binning}")
+        self._camera_roi = None
+        binning = int(binning)
+        return self._set_subframe(FrameRegion(0, 0, int(width) // binning, int(height) // binning))
+
+    def invalidate_frame_geometry(self):
+        with self._frame_geometry_lock:
+            self._frame_geometry = None
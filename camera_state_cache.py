@@ -0,0 +1,160 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic
+
+
+logger = logging.getLogger(__name__)
+
+
+default_ttl_s = 1.0
+# properties are fetched this many at a time when the server has no batched endpoint
+fallback_concurrency = 8
+
+# None means that the value is only refreshed after invalidation
+property_ttls_s = {
+    "get_readoutmodes": None,
+    "get_maxbinx": None,
+    "get_cansetcooleron": None,
+    "get_cansetccdtemperature": None,
+    "get_cangetcoolerpower": None,
+    "get_cameraxsize": None,
+    "get_cameraysize": None,
+    "get_binx": 60.0,
+    "get_numx": 60.0,
+    "get_numy": 60.0,
+    "get_startx": 60.0,
+    "get_starty": 60.0,
+    "get_readoutmode_str": 60.0,
+    "get_gain": 5.0,
+    "get_offset": 5.0,
+    "get_exposure": 5.0,
+    "get_setccdtemperature": 5.0,
+    "get_ccdtemperature": 2.0,
+    "get_cooleron": 2.0,
+    "get_coolerpower": 2.0,
+    "get_status": 0.5,
+}
+
+invalidated_by_setter = {
+    "set_gain": ["get_gain"],
+    "set_offset": ["get_offset"],
+    "set_exposure": ["get_exposure"],
+    "set_readoutmode_str": ["get_readoutmode_str", "get_numx", "get_numy"],
+    "set_binx": ["get_binx", "get_numx", "get_numy", "get_startx", "get_starty"],
+    "set_startx": ["get_startx"],
+    "set_starty": ["get_starty"],
+    "set_numx": ["get_numx"],
+    "set_numy": ["get_numy"],
+    "set_cooleron": ["get_cooleron", "get_coolerpower"],
+    "set_setccdtemperature": ["get_setccdtemperature"],
+    "start_capturing": ["get_status"],
+    "stop_capturing": ["get_status"],
+    "start_saving": ["get_status"],
+    "stop_saving": ["get_status"],
+}
+
+
+class CameraStateCache:
+    def __init__(self, fetch_single, fetch_batch, ttls_s=None):
+        self._fetch_single = fetch_single
+        self._fetch_batch = fetch_batch
+        self._ttls_s = dict(property_ttls_s)
+        self._ttls_s.update(ttls_s or {})
+        self._entries = {}
+        self._lock = Lock()
+        self._executor = None
+        self._closed = False
+
+    def _ttl_for(self, endpoint):
+        return self._ttls_s.get(endpoint, default_ttl_s)
+
+    def _is_fresh(self, endpoint, now):
+        entry = self._entries.get(endpoint)
+        if entry is None:
+            return False
+        ttl = self._ttl_for(endpoint)
+        return ttl is None or now - entry[1] < ttl
+
+    def store(self, endpoint, value):
+        with self._lock:
+            self._entries[endpoint] = (value, monotonic())
+
+    def lookup(self, endpoint):
+        # the value if it is still fresh, never a request
+        with self._lock:
+            if self._is_fresh(endpoint, monotonic()):
+                logger.debug(f"Serving {endpoint} from cache")
+                return True, self._entries[endpoint][0]
+        return False, None
+
+    def stale(self, endpoints, force=False):
+        with self._lock:
+            now = monotonic()
+            return [e for e in dict.fromkeys(endpoints) if force or not self._is_fresh(e, now)]
+
+    def get(self, endpoint):
+        is_fresh, value = self.lookup(endpoint)
+        if is_fresh:
+            return True, value
+
+        is_ok, value = self._fetch_single(endpoint)
+        if is_ok:
+            self.store(endpoint, value)
+        return is_ok, value
+
+    def peek(self, endpoint):
+        # the last known value however old it is, never a request
+        with self._lock:
+            entry = self._entries.get(endpoint)
+        return (False, None) if entry is None else (True, entry[0])
+
+    def prefetch(self, endpoints, force=False):
+        missing = self.stale(endpoints, force)
+        if not missing:
+            return
+        logger.debug(f"Prefetching {len(missing)} properties: {missing}")
+
+        values = self._fetch_batch(missing)
+        if values is None:
+            logger.debug("Batched fetch unavailable, falling back to concurrent requests per property")
+            values = {endpoint: value for endpoint, (is_ok, value) in zip(missing, self._fetch_each(missing)) if is_ok}
+
+        for endpoint, value in values.items():
+            self.store(endpoint, value)
+
+    def _fetch_each(self, endpoints):
+        if len(endpoints) == 1:
+            return [self._fetch_single(endpoints[0])]
+        with self._lock:
+            if self._closed:
+                # a fetch after close must not start the worker threads again
+                executor = None
+            else:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=fallback_concurrency,
+                                                        thread_name_prefix="PropertyFetch")
+                executor = self._executor
+        if executor is None:
+            return [self._fetch_single(e) for e in endpoints]
+        return list(executor.map(self._fetch_single, endpoints))
+
+    def invalidate(self, endpoints):
+        with self._lock:
+            for endpoint in endpoints:
+                self._entries.pop(endpoint, None)
+
+    def invalidate_for_setter(self, setter):
+        self.invalidate(invalidated_by_setter.get(setter, []))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        # fetches already running finish by themselves, closing must not wait for the camera
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
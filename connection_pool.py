@@ -0,0 +1,103 @@
+import logging
+from threading import Lock, Thread, Event
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+
+default_pool_size = 10
+default_timeout_s = 5
+default_endpoint_timeouts_s = {
+    "get_last_image": 10,
+    "stream_frames": 3600,
+}
+
+
+class ConnectionPoolClosed(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, pool_size=default_pool_size, keep_alive=True, timeout_s=default_timeout_s,
+                 endpoint_timeouts_s=None):
+        self._pool_size = pool_size
+        self._keep_alive = keep_alive
+        self._timeout_s = timeout_s
+        self._endpoint_timeouts_s = dict(default_endpoint_timeouts_s)
+        self._endpoint_timeouts_s.update(endpoint_timeouts_s or {})
+        self._sessions = {}
+        self._lock = Lock()
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, config):
+        settings = config.get("connection", {})
+        logger.debug(f"Creating connection pool with settings: {settings}")
+        return cls(pool_size=int(settings.get("pool_size", default_pool_size)),
+                   keep_alive=bool(settings.get("keep_alive", True)),
+                   timeout_s=float(settings.get("timeout_s", default_timeout_s)),
+                   endpoint_timeouts_s=settings.get("endpoint_timeouts_s", {}))
+
+    def _create_session(self, host):
+        logger.debug(f"Opening new session for {host} with pool size {self._pool_size}")
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not self._keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _session_for(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if self._closed:
+                raise ConnectionPoolClosed(f"Connection pool is closed, refusing request to {url}")
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._create_session(host)
+                self._sessions[host] = session
+            return session
+
+    def timeout_for(self, url):
+        endpoint = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+        return self._endpoint_timeouts_s.get(endpoint, self._timeout_s)
+
+    def connect_timeout(self):
+        return self._timeout_s
+
+    def pool_size(self):
+        return self._pool_size
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout_for(url))
+        return self._session_for(url).get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout_for(url))
+        return self._session_for(url).post(url, **kwargs)
+
+    def is_closed(self):
+        return self._closed
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        logger.debug(f"Closing {len(sessions)} pooled session(s)")
+        for session in sessions:
+            session.close()
+
+    def close_on(self, kill_event: Event):
+        def wait_and_close():
+            kill_event.wait()
+            self.close()
+
+        Thread(target=wait_and_close, name="ConnectionPoolCloser", daemon=True).start()
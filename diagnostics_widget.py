@@ -0,0 +1,86 @@
+import logging
+from PyQt5.QtWidgets import QWidget, QLabel, QHBoxLayout, QVBoxLayout, QPushButton, QTableWidget, \
+    QTableWidgetItem, QFileDialog, QHeaderView
+from PyQt5.QtCore import QTimer
+
+from metrics import Metrics, snapshot_columns
+
+
+logger = logging.getLogger(__name__)
+
+
+diagnostics_refresh_ms = 1000
+
+
+class DiagnosticsWidget(QWidget):
+    def __init__(self, metrics: Metrics):
+        super(DiagnosticsWidget, self).__init__()
+        self._metrics = metrics
+
+        # the table is only refreshed while the diagnostics tab is visible
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(diagnostics_refresh_ms)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+        layout = QVBoxLayout()
+        buttons_layout = QHBoxLayout()
+
+        self._table = QTableWidget(0, len(snapshot_columns))
+        self._table.setHorizontalHeaderLabels(snapshot_columns)
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self._table.verticalHeader().setVisible(False)
+        self._table.setEditTriggers(QTableWidget.NoEditTriggers)
+
+        reset_button = QPushButton("Reset")
+        reset_button.setMaximumSize(100, 50)
+        reset_button.clicked.connect(self._reset)
+
+        export_button = QPushButton("Export...")
+        export_button.setMaximumSize(100, 50)
+        export_button.clicked.connect(self._export)
+
+        self._summary_label = QLabel("No requests yet")
+
+        buttons_layout.addWidget(self._summary_label)
+        buttons_layout.addWidget(reset_button)
+        buttons_layout.addWidget(export_button)
+
+        layout.addWidget(self._table)
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        self.refresh()
+        self._refresh_timer.start()
+        super(DiagnosticsWidget, self).showEvent(event)
+
+    def hideEvent(self, event):
+        self._refresh_timer.stop()
+        super(DiagnosticsWidget, self).hideEvent(event)
+
+    def refresh(self):
+        rows = self._metrics.snapshot()
+        self._table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, column in enumerate(snapshot_columns):
+                self._table.setItem(i, j, QTableWidgetItem(str(row[column])))
+        endpoints = [r for r in rows if r["kind"] == "endpoint"]
+        if endpoints:
+            requests = sum(r["count"] for r in endpoints)
+            errors = sum(r["errors"] for r in endpoints)
+            megabytes = sum(r["bytes"] for r in endpoints) / 1e6
+            self._summary_label.setText(f"{requests} requests, {errors} errors, {megabytes:.1f} MB")
+
+    def _reset(self):
+        self._metrics.reset()
+        self._summary_label.setText("No requests yet")
+        self.refresh()
+
+    def _export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export metrics", "metrics.csv", "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            self._metrics.export(path)
+        except OSError as e:
+            logger.error(f"Could not export metrics to {path}: {e}")
@@ -0,0 +1,105 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+from fast_stretch import apply_lut, integer_levels, percentiles_from_histogram
+from frame_statistics import FrameStatistics, frame_statistics
+
+
+logger = logging.getLogger(__name__)
+
+
+stretch_modes = ["linear", "asinh", "log", "auto-stf"]
+
+default_asinh_beta = 10.0
+default_log_scale = 1000.0
+stf_shadows_clipping = -2.8
+stf_target_background = 0.25
+output_buffers_count = 3
+
+
+def midtones_transfer(m, x):
+    return ((m - 1) * x) / ((2 * m - 1) * x - m)
+
+
+@lru_cache(maxsize=64)
+def stretch_lut(mode, levels, black, white, parameter):
+    logger.debug(f"Building {mode} LUT for {levels} levels, black={black}, white={white}, parameter={parameter}")
+    x = np.clip((np.arange(levels, dtype=np.float64) - black) / max(white - black, 1), 0, 1)
+    if mode == "asinh":
+        x = np.arcsinh(parameter * x) / np.arcsinh(parameter)
+    elif mode == "log":
+        x = np.log1p(parameter * x) / np.log1p(parameter)
+    elif mode == "auto-stf":
+        x = midtones_transfer(parameter, x)
+    lut = (255 * x + 0.5).astype(np.uint8)
+    lut.setflags(write=False)
+    return lut
+
+
+def median_and_mad(statistics: FrameStatistics):
+    counts = statistics.histogram
+    median = statistics.median()
+    deviations = np.abs(np.arange(len(counts)) - median).astype(np.int64)
+    deviation_counts = np.bincount(deviations, weights=counts)
+    mad, = percentiles_from_histogram(deviation_counts, (50,))
+    return median, mad
+
+
+def stretch_parameters(mode, statistics: FrameStatistics):
+    levels = statistics.levels()
+    if mode == "linear":
+        black, white = statistics.percentiles((5, 95))
+        return int(black), int(round(white)), 0.0
+    if mode in ("asinh", "log"):
+        black, white = statistics.percentiles((5, 99.9))
+        parameter = default_asinh_beta if mode == "asinh" else default_log_scale
+        return int(black), int(round(white)), parameter
+
+    median, mad = median_and_mad(statistics)
+    median_n = median / (levels - 1)
+    mad_n = 1.4826 * mad / (levels - 1)
+    shadows = min(max(median_n + stf_shadows_clipping * mad_n, 0.0), median_n)
+    midtones = midtones_transfer(stf_target_background, median_n - shadows) if median_n > shadows else 0.5
+    # rounding keeps the LUT cache hit rate high while the sky background slowly drifts
+    return int(shadows * (levels - 1)), levels - 1, round(float(midtones), 3)
+
+
+class DisplayStretch:
+    def __init__(self, mode="linear", stats_max_pixels=0):
+        self._mode = mode
+        self._stats_max_pixels = stats_max_pixels
+        self._buffers = []
+        self._next_buffer = 0
+
+    def mode(self):
+        return self._mode
+
+    def set_mode(self, mode):
+        if mode not in stretch_modes:
+            raise ValueError(f"Unknown stretch mode: {mode}")
+        logger.debug(f"Display stretch mode set to {mode}")
+        self._mode = mode
+
+    def _output_buffer(self, shape):
+        if not self._buffers or self._buffers[0].shape != shape:
+            logger.debug(f"Allocating {output_buffers_count} display buffers of shape {shape}")
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(output_buffers_count)]
+        # frames are handed over to the GUI thread, so consecutive frames must not share a buffer
+        buffer = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % output_buffers_count
+        return buffer
+
+    def lut_for(self, statistics: FrameStatistics):
+        mode = self._mode
+        black, white, parameter = stretch_parameters(mode, statistics)
+        return stretch_lut(mode, statistics.levels(), black, white, parameter)
+
+    def apply(self, img, statistics: FrameStatistics = None):
+        if statistics is None:
+            statistics = frame_statistics(img, self._stats_max_pixels)
+        lut = self.lut_for(statistics)
+        if len(lut) < integer_levels(img.dtype):
+            raise ValueError(f"LUT with {len(lut)} entries cannot be applied to {img.dtype} frame")
+        return apply_lut(lut, img, self._output_buffer(img.shape))
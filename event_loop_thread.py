@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from threading import Thread, Event
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+logger = logging.getLogger(__name__)
+
+
+class QtCallbackDispatcher(QObject):
+    _deliver = pyqtSignal(object, object)
+
+    def __init__(self):
+        super(QtCallbackDispatcher, self).__init__()
+        self._deliver.connect(self._invoke)
+
+    @staticmethod
+    def _invoke(callback, result):
+        callback(result)
+
+    def call_soon(self, callback, result):
+        self._deliver.emit(callback, result)
+
+
+class EventLoopThread:
+    def __init__(self, name="AsyncCameraIO"):
+        self._loop = asyncio.new_event_loop()
+        self._dispatcher = QtCallbackDispatcher()
+        self._thread = Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        logger.debug("Asyncio event loop started")
+        self._loop.run_forever()
+        logger.debug("Asyncio event loop stopped")
+
+    def loop(self):
+        return self._loop
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout_s=None):
+        return self.submit(coro).result(timeout_s)
+
+    def submit_to_qt(self, coro, callback=None):
+        def on_done(future):
+            if future.cancelled():
+                return
+            exception = future.exception()
+            if exception is not None:
+                logger.error(f"Async task failed: {exception}")
+                return
+            if callback is not None:
+                self._dispatcher.call_soon(callback, future.result())
+
+        future = self.submit(coro)
+        future.add_done_callback(on_done)
+        return future
+
+    def call_in_qt(self, callback, result=None):
+        self._dispatcher.call_soon(callback, result)
+
+    def stop(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stop_on(self, kill_event: Event):
+        def wait_and_stop():
+            kill_event.wait()
+            self.stop()
+
+        Thread(target=wait_and_stop, name="EventLoopStopper", daemon=True).start()
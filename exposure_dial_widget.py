@@ -35,11 +35,15 @@ class ExposureDial(QWidget):
         self.setLayout(self._layout)
         self.setMaximumSize(250, 50)
 
+    @staticmethod
+    def required_properties():
+        return ["get_exposure"]
+
     def _changed_exposure(self, value):
         self._exposure_us = value * 1000.0 if self._exposure_range == "milliseconds" else value * 1000000.0
         exp_s_str = str(self._exposure_us / 1000000)
         logger.debug(f"Exposure in us = {self._exposure_us}, seconds={exp_s_str}")
-        self._requester.set_exposure(exp_s_str)
+        self._requester.call(self._requester.set_exposure(exp_s_str))
 
     def _changed_time_range(self, new_text):
         self._exposure_range = new_text
@@ -48,7 +52,10 @@ class ExposureDial(QWidget):
         logger.debug(f"Exposure range set to: {self._exposure_range}")
 
     def _refresh_impl(self):
-        is_ok, exp_raw = self._requester.get_exposure()
+        self._requester.call(self._requester.get_exposure(), self._show_exposure)
+
+    def _show_exposure(self, result):
+        is_ok, exp_raw = result
         if not is_ok:
             logger.error("Could not get current exposure value!")
             return
@@ -61,10 +68,13 @@ class ExposureDial(QWidget):
         self._exp_spin.setDecimals(2)
         self._exp_spin.setRange(0.01, 3600)
 
+        # the value read from the camera is not sent back to it
+        self._exp_spin.blockSignals(True)
         if self._exp_range_combo.currentText() == "seconds":
             self._exp_spin.setValue(exp_s)
         else:
             self._exp_spin.setValue(exp_ms)
+        self._exp_spin.blockSignals(False)
 
     def refresh(self):
         logger.debug("Refreshing exposure info...")
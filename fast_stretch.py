@@ -0,0 +1,62 @@
+import logging
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# numpy converts indices to intp for bincount and take, so large frames are processed
+# in blocks of rows to keep that temporary small
+block_pixels = 1 << 18
+
+
+def integer_levels(dtype):
+    return 65536 if np.dtype(dtype) == np.uint16 else 256
+
+
+def _row_block_size(img):
+    return max(1, block_pixels // max(1, img.shape[1]))
+
+
+def histogram_of(img, subsample=1):
+    sampled = img[::subsample, ::subsample] if subsample > 1 else img
+    levels = integer_levels(img.dtype)
+    if sampled.ndim != 2:
+        return np.bincount(sampled.ravel(), minlength=levels)
+    counts = np.zeros(levels, dtype=np.int64)
+    rows = _row_block_size(sampled)
+    for start in range(0, sampled.shape[0], rows):
+        counts += np.bincount(sampled[start:start + rows].ravel(), minlength=levels)
+    return counts
+
+
+def apply_lut(lut, img, out=None):
+    if out is None:
+        out = np.empty(img.shape, dtype=lut.dtype)
+    if img.ndim != 2:
+        return np.take(lut, img, out=out)
+    rows = _row_block_size(img)
+    for start in range(0, img.shape[0], rows):
+        np.take(lut, img[start:start + rows], out=out[start:start + rows])
+    return out
+
+
+def _lerp(a, b, t):
+    # same formula as np.percentile uses for the "linear" method
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+def percentiles_from_histogram(counts, qs):
+    cumulative = np.cumsum(counts)
+    n = int(cumulative[-1])
+    results = []
+    for q in qs:
+        position = (n - 1) * (q / 100.0)
+        lower = int(np.floor(position))
+        fraction = position - lower
+        lower_value = int(np.searchsorted(cumulative, lower, side="right"))
+        upper_value = int(np.searchsorted(cumulative, min(lower + 1, n - 1), side="right"))
+        results.append(_lerp(float(lower_value), float(upper_value), fraction))
+    return results
@@ -11,24 +11,24 @@ class FormatChooser(QWidget):
         self._requester = requester
         self._layout = QHBoxLayout()
         self._send_as_jpg = True
+        self._compress_raw = False
+        self._default_format = default_format
 
         self.format_combo = QComboBox()
-        format_values = self._read_possible_formats()
-        self.format_combo.addItems(format_values)
         self.format_combo.currentTextChanged.connect(self._changed_format)
-        logger.debug(f"Default format = {default_format}")
-        self.format_combo.setCurrentText(default_format)
+        self._requester.call(self._requester.get_formats(), self._show_formats)
 
         self.jpg_combo = QComboBox()
-        self.jpg_combo.addItems(["jpg", "raw"])
-        self.jpg_combo.setCurrentText("raw")
+        self.jpg_combo.addItems(["jpg", "raw", "raw (compressed)"])
         self.jpg_combo.currentTextChanged.connect(self._changed_jpg)
+        self.jpg_combo.setCurrentText("raw")
 
         format_label = QLabel("Image type:")
         format_label.setMaximumSize(100, 20)
 
         transfer_label = QLabel("Send as:")
         transfer_label.setMaximumSize(60, 20)
+        self.jpg_combo.setMinimumWidth(130)
 
         self._layout.addWidget(format_label)
         self._layout.addWidget(self.format_combo)
@@ -38,27 +38,44 @@ class FormatChooser(QWidget):
         self.setLayout(self._layout)
         self.setMaximumSize(300, 50)
 
-    def _read_possible_formats(self):
-        is_ok, formats = self._requester.get_formats()
+    @staticmethod
+    def required_properties():
+        return ["get_readoutmodes"]
+
+    def _show_formats(self, result):
+        is_ok, formats = result
         if not is_ok:
-            return None
+            logger.error("Could not get possible formats!")
+            return
         logger.debug(f"Formats = {formats}")
-        return formats
+        # listing the formats does not choose one, only the default below is sent to the camera
+        self.format_combo.blockSignals(True)
+        self.format_combo.addItems(formats)
+        self.format_combo.blockSignals(False)
+        logger.debug(f"Default format = {self._default_format}")
+        self.format_combo.setCurrentText(self._default_format)
 
     def _changed_format(self, t):
         logger.debug(f"New format chosen: {t}")
-        self._requester.set_format(t)
+        self._requester.call(self._requester.set_format(t))
 
     def _changed_jpg(self, j):
         if j == "jpg":
             self._send_as_jpg = True
         elif j == "raw":
             self._send_as_jpg = False
+            self._compress_raw = False
+        elif j == "raw (compressed)":
+            self._send_as_jpg = False
+            self._compress_raw = True
 
         logger.debug(f"Changed jpg to: {j}, value = {str(self._send_as_jpg)}")
 
     def should_send_jpg(self):
         return self._send_as_jpg
 
+    def should_compress_raw(self):
+        return not self._send_as_jpg and self._compress_raw
+
     def refresh(self):
         pass
@@ -0,0 +1,61 @@
+import logging
+from threading import Lock
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# enough for one frame being received, one waiting for decode, one being decoded,
+# one waiting for display and one shown, plus a spare
+default_buffers_count = 6
+read_chunk_size = 1 << 20
+
+
+class FrameBufferRing:
+    def __init__(self, count=default_buffers_count):
+        self._count = count
+        self._buffers = []
+        self._buffer_size = 0
+        self._next_buffer = 0
+        self._lock = Lock()
+
+    def acquire(self, size):
+        with self._lock:
+            if size > self._buffer_size:
+                logger.debug(f"Allocating {self._count} frame buffers of {size} bytes")
+                self._buffers = [np.empty(size, dtype=np.uint8) for _ in range(self._count)]
+                self._buffer_size = size
+            # buffers are reused round robin, consumers that keep a frame longer have to copy it
+            buffer = self._buffers[self._next_buffer]
+            self._next_buffer = (self._next_buffer + 1) % self._count
+            return buffer[:size]
+
+
+def _unwrapped(raw):
+    # urllib3 reads a bytes object of the whole size for readinto and copies it over,
+    # the http.client response it wraps reads straight into the buffer
+    fp = getattr(raw, "_fp", None)
+    if fp is None or not hasattr(fp, "readinto") or not hasattr(fp, "isclosed"):
+        return None
+    return fp
+
+
+def read_into(raw, out):
+    view = memoryview(out).cast("B")
+    fp = _unwrapped(raw)
+    received = 0
+    while received < len(view):
+        if fp is not None:
+            n = fp.readinto(view[received:])
+        else:
+            # bounded reads keep what other readers allocate for each call small
+            n = raw.readinto(view[received:received + read_chunk_size])
+        if not n:
+            raise EOFError(f"Frame ended after {received} of {len(view)} bytes")
+        received += n
+    if fp is not None and fp.isclosed():
+        # urllib3 did not see the body end, without this closing the response would also close its connection
+        raw.release_conn()
+    return received
@@ -0,0 +1,125 @@
+import logging
+import zlib
+from time import perf_counter
+
+import numpy as np
+
+from frame_buffer_ring import FrameBufferRing, read_into
+
+
+logger = logging.getLogger(__name__)
+
+
+accept_compression_header = "X-Accept-Frame-Compression"
+compression_header = "X-Frame-Compression"
+frame_size_header = "X-Frame-Size"
+chunk_size = 1 << 16
+
+
+def _deflate_codec():
+    return zlib.decompressobj, lambda data: zlib.compress(data, 1)
+
+
+def _zstd_codec():
+    import zstandard
+    return (lambda: zstandard.ZstdDecompressor().decompressobj(),
+            lambda data: zstandard.ZstdCompressor(level=1).compress(data))
+
+
+def _lz4_codec():
+    import lz4.frame
+    return lz4.frame.LZ4FrameDecompressor, lz4.frame.compress
+
+
+def _load_codecs():
+    loaded = {}
+    # faster codecs first, deflate from stdlib is always available as the last resort
+    for name, loader in [("zstd", _zstd_codec), ("lz4", _lz4_codec), ("deflate", _deflate_codec)]:
+        try:
+            loaded[name] = loader()
+        except ImportError:
+            logger.debug(f"Compression codec {name} is not installed")
+    return loaded
+
+
+codecs = _load_codecs()
+
+
+def available_codecs():
+    return list(codecs.keys())
+
+
+def choose_codec(accepted_header):
+    accepted = [c.strip() for c in accepted_header.split(",") if c.strip()]
+    for name in accepted:
+        if name in codecs:
+            return name
+    return None
+
+
+def compress(codec, data):
+    return codecs[codec][1](data)
+
+
+class TransferStats:
+    def __init__(self, codec, transferred_bytes, frame_bytes, decode_time_s):
+        self.codec = codec
+        self.transferred_bytes = transferred_bytes
+        self.frame_bytes = frame_bytes
+        self.decode_time_s = decode_time_s
+
+    def ratio(self):
+        return self.frame_bytes / self.transferred_bytes if self.transferred_bytes else 0.0
+
+    def __str__(self):
+        if self.codec is None:
+            return f"uncompressed {self.frame_bytes / 1e6:.1f} MB"
+        return f"{self.codec} {self.ratio():.1f}x, decode {self.decode_time_s * 1000:.0f} ms"
+
+
+def _acquire(buffer_ring: FrameBufferRing, size):
+    return buffer_ring.acquire(size) if buffer_ring is not None else np.empty(size, dtype=np.uint8)
+
+
+def receive_frame(response, buffer_ring: FrameBufferRing = None):
+    # a body left half read would otherwise keep its pooled connection, a fully read one is already back in the pool
+    try:
+        return _read_frame(response, buffer_ring)
+    finally:
+        response.close()
+
+
+def _read_frame(response, buffer_ring: FrameBufferRing = None):
+    codec = response.headers.get(compression_header)
+    if codec is None:
+        length = response.headers.get("Content-Length")
+        if length is None or response.raw is None or "Content-Encoding" in response.headers:
+            content = response.content
+            return content, TransferStats(None, len(content), len(content), 0.0)
+        out = _acquire(buffer_ring, int(length))
+        read_into(response.raw, out)
+        return out, TransferStats(None, len(out), len(out), 0.0)
+
+    if codec not in codecs:
+        raise ValueError(f"Server sent frame compressed with unsupported codec: {codec}")
+    frame_bytes = int(response.headers[frame_size_header])
+    out = _acquire(buffer_ring, frame_bytes)
+    decompressor = codecs[codec][0]()
+    transferred = 0
+    written = 0
+    decode_time_s = 0.0
+    for chunk in response.iter_content(chunk_size):
+        transferred += len(chunk)
+        start_time = perf_counter()
+        data = decompressor.decompress(chunk)
+        if written + len(data) > frame_bytes:
+            raise ValueError(f"Decompressed frame exceeds announced size of {frame_bytes} bytes")
+        out[written:written + len(data)] = np.frombuffer(data, dtype=np.uint8)
+        written += len(data)
+        decode_time_s += perf_counter() - start_time
+
+    if written != frame_bytes:
+        raise ValueError(f"Decompressed frame has {written} bytes, expected {frame_bytes}")
+    stats = TransferStats(codec, transferred, frame_bytes, decode_time_s)
+    logger.debug(f"Received frame: {stats}")
+    return out, stats
@@ -0,0 +1,43 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+frame_sequence_header = "X-Frame-Sequence"
+wait_after_param = "wait_after"
+wait_timeout_param = "wait_timeout"
+
+# a poll per tenth of the exposure keeps the extra latency low while 304 responses cost next to nothing
+polls_per_exposure = 10
+max_derived_interval_s = 5.0
+min_wait_timeout_s = 5.0
+
+
+def etag_for(sequence, image_format):
+    return f'"{sequence}-{image_format}"'
+
+
+def sequence_from_headers(headers):
+    value = headers.get(frame_sequence_header)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Server sent invalid frame sequence: {value}")
+        return None
+
+
+def polling_interval_s(requested_interval_s, exposure_us):
+    if exposure_us is None:
+        return requested_interval_s
+    derived = min(float(exposure_us) / 1000000.0 / polls_per_exposure, max_derived_interval_s)
+    return max(requested_interval_s, derived)
+
+
+def wait_timeout_s(exposure_us):
+    if exposure_us is None:
+        return min_wait_timeout_s
+    # readout and transfer come on top of the exposure itself
+    return max(min_wait_timeout_s, 1.5 * float(exposure_us) / 1000000.0)
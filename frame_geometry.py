@@ -0,0 +1,85 @@
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+bit_depth_for_format = {"RAW16": 16}
+# region of interest cropped by the server, in pixels of the binned frame
+roi_param = "roi"
+roi_header = "X-Frame-ROI"
+
+
+class FrameRegion:
+    def __init__(self, x, y, width, height):
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+
+    def __repr__(self):
+        return f"FrameRegion({self.width}x{self.height} at {self.x},{self.y})"
+
+    def __eq__(self, other):
+        return isinstance(other, FrameRegion) and self.as_tuple() == other.as_tuple()
+
+    def as_tuple(self):
+        return self.x, self.y, self.width, self.height
+
+    def as_param(self):
+        return ",".join(str(v) for v in self.as_tuple())
+
+    @classmethod
+    def from_param(cls, text):
+        try:
+            x, y, width, height = (int(v) for v in text.split(","))
+        except (AttributeError, ValueError):
+            return None
+        return cls(x, y, width, height)
+
+    def origin(self):
+        return self.x, self.y
+
+    def offset(self, x, y):
+        return FrameRegion(self.x + x, self.y + y, self.width, self.height)
+
+    def clamped(self, frame_width, frame_height):
+        # the part of the region inside the frame, None if there is none
+        x, y = max(0, self.x), max(0, self.y)
+        right, bottom = min(frame_width, self.x + self.width), min(frame_height, self.y + self.height)
+        if right <= x or bottom <= y:
+            return None
+        return FrameRegion(x, y, right - x, bottom - y)
+
+
+class FrameGeometry:
+    def __init__(self, width, height, bit_depth, binning):
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.binning = binning
+
+    def __repr__(self):
+        return f"FrameGeometry({self.width}x{self.height}, {self.bit_depth} bit, bin {self.binning})"
+
+    def __eq__(self, other):
+        return isinstance(other, FrameGeometry) and self.as_tuple() == other.as_tuple()
+
+    def as_tuple(self):
+        return self.width, self.height, self.bit_depth, self.binning
+
+    def bytes_per_pixel(self):
+        return 2 if self.bit_depth > 8 else 1
+
+    def frame_size_bytes(self):
+        return self.width * self.height * self.bytes_per_pixel()
+
+    def cropped(self, region: FrameRegion):
+        return FrameGeometry(region.width, region.height, self.bit_depth, self.binning)
+
+    def matches_payload(self, payload_size):
+        return payload_size == self.frame_size_bytes()
+
+    @classmethod
+    def from_camera_values(cls, numx, numy, readout_format, binning):
+        return cls(int(numx), int(numy), bit_depth_for_format.get(readout_format, 8), binning)
@@ -0,0 +1,98 @@
+import logging
+
+import numpy as np
+
+from fast_stretch import apply_lut
+
+
+logger = logging.getLogger(__name__)
+
+
+default_history_cap_mb = 256
+
+
+class FrameHistory:
+    def __init__(self, cap_mb=default_history_cap_mb):
+        self._cap_bytes = int(cap_mb * 1024 * 1024)
+        self._frames = None
+        self._count = 0
+        self._next_sequence = 0
+        self._difference_buffers = []
+
+    def cap_mb(self):
+        return self._cap_bytes / (1024 * 1024)
+
+    def set_cap_mb(self, cap_mb):
+        logger.debug(f"Frame history cap set to {cap_mb} MB, dropping {self._count} frames")
+        self._cap_bytes = int(cap_mb * 1024 * 1024)
+        self.clear()
+
+    def clear(self):
+        self._frames = None
+        self._count = 0
+        self._difference_buffers = []
+
+    def capacity(self):
+        return 0 if self._frames is None else len(self._frames)
+
+    def __len__(self):
+        return self._count
+
+    def _allocate(self, shape, dtype):
+        frame_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        capacity = self._cap_bytes // frame_bytes
+        if capacity < 1:
+            logger.warning(f"Frame of {frame_bytes} bytes does not fit in history cap of {self.cap_mb()} MB")
+            self.clear()
+            return False
+        logger.debug(f"Allocating history of {capacity} frames of shape {shape}")
+        # one contiguous block, frames are copied into their slot instead of being kept as separate arrays
+        self._frames = np.empty((capacity,) + tuple(shape), dtype=dtype)
+        self._count = 0
+        self._difference_buffers = []
+        return True
+
+    def append(self, pixels):
+        if self._frames is None or self._frames.shape[1:] != pixels.shape or self._frames.dtype != pixels.dtype:
+            if not self._allocate(pixels.shape, pixels.dtype):
+                return None
+        sequence = self._next_sequence
+        # the oldest frame is overwritten once the history is full
+        np.copyto(self._frames[sequence % len(self._frames)], pixels)
+        self._next_sequence += 1
+        self._count = min(self._count + 1, len(self._frames))
+        return sequence
+
+    def newest_sequence(self):
+        return self._next_sequence - 1 if self._count else None
+
+    def oldest_sequence(self):
+        return self._next_sequence - self._count if self._count else None
+
+    def contains(self, sequence):
+        return self._count > 0 and self.oldest_sequence() <= sequence <= self.newest_sequence()
+
+    def frame(self, sequence):
+        if not self.contains(sequence):
+            return None
+        # a view into the history, it gets overwritten when the slot is reused
+        return self._frames[sequence % len(self._frames)]
+
+    def frame_at(self, index):
+        return self.frame(self.oldest_sequence() + index) if 0 <= index < self._count else None
+
+    def difference(self, sequence, reference):
+        a, b = self.frame(sequence), self.frame(reference)
+        if a is None or b is None:
+            return None
+        if not self._difference_buffers:
+            self._difference_buffers = [np.empty(a.shape, dtype=a.dtype), np.empty(a.shape, dtype=a.dtype),
+                                        np.empty(a.shape, dtype=np.uint8)]
+        high, low, out = self._difference_buffers
+        np.maximum(a, b, out=high)
+        np.minimum(a, b, out=low)
+        np.subtract(high, low, out=high)
+        top = int(high.max()) or 1
+        levels = np.iinfo(a.dtype).max + 1
+        lut = np.minimum(np.arange(levels, dtype=np.uint32) * 255 // top, 255).astype(np.uint8)
+        return apply_lut(lut, high, out)
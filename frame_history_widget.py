@@ -0,0 +1,160 @@
+import logging
+from PyQt5.QtWidgets import QWidget, QLabel, QComboBox, QHBoxLayout, QVBoxLayout, QPushButton, QSlider, QSpinBox
+from PyQt5.QtCore import Qt, QTimer
+
+from display_stretch import DisplayStretch
+from frame_history import FrameHistory, default_history_cap_mb
+from frame_statistics import frame_statistics
+
+
+logger = logging.getLogger(__name__)
+
+
+history_modes = ["live", "scrub", "blink", "difference"]
+blink_interval_ms = 500
+
+
+class FrameHistoryWidget(QWidget):
+    def __init__(self, image_label, cap_mb=default_history_cap_mb):
+        super(FrameHistoryWidget, self).__init__()
+        self._image_label = image_label
+        self._history = FrameHistory(cap_mb)
+        self._selected = None
+        self._reference = None
+        self._blink_shows_reference = False
+        # raw frames are kept as decoded and stretched here, all with the statistics of the reference frame
+        self._stretch = DisplayStretch()
+        self._needs_stretch = False
+        self._reference_statistics = None
+
+        self._blink_timer = QTimer(self)
+        self._blink_timer.setInterval(blink_interval_ms)
+        self._blink_timer.timeout.connect(self._blink)
+
+        layout = QVBoxLayout()
+        options_layout = QHBoxLayout()
+
+        self._mode_combo = QComboBox()
+        self._mode_combo.addItems(history_modes)
+        self._mode_combo.currentTextChanged.connect(self._changed_mode)
+
+        self._slider = QSlider(Qt.Horizontal)
+        self._slider.setRange(0, 0)
+        self._slider.valueChanged.connect(self._changed_position)
+
+        self._reference_button = QPushButton("Set reference")
+        self._reference_button.setMaximumSize(100, 50)
+        self._reference_button.clicked.connect(self._set_reference)
+
+        self._cap_spin = QSpinBox()
+        self._cap_spin.setRange(16, 8192)
+        self._cap_spin.setSingleStep(64)
+        self._cap_spin.setSuffix(" MB")
+        self._cap_spin.setValue(int(cap_mb))
+        self._cap_spin.editingFinished.connect(self._changed_cap)
+
+        history_label = QLabel("History:")
+        history_label.setMaximumSize(60, 20)
+        self._frames_label = QLabel("0 frames")
+
+        options_layout.addWidget(history_label)
+        options_layout.addWidget(self._mode_combo)
+        options_layout.addWidget(self._reference_button)
+        options_layout.addWidget(self._cap_spin)
+        options_layout.addWidget(self._frames_label)
+
+        layout.addLayout(options_layout)
+        layout.addWidget(self._slider)
+        self.setLayout(layout)
+
+    def is_live(self):
+        return self._mode_combo.currentText() == "live"
+
+    def add_frame(self, frame, stretch_mode="linear"):
+        # raw frames have a display copy, JPEG frames are shown as they are
+        self._needs_stretch = frame.display is not None
+        if stretch_mode != self._stretch.mode():
+            self._stretch.set_mode(stretch_mode)
+        if self._history.append(frame.pixels) is None:
+            return
+        if self.is_live() or self._selected is None:
+            self._selected = self._history.newest_sequence()
+        self._update_slider()
+
+    def _clamp(self, sequence):
+        if sequence is None or not len(self._history):
+            return None
+        return min(max(sequence, self._history.oldest_sequence()), self._history.newest_sequence())
+
+    def _update_slider(self):
+        self._selected = self._clamp(self._selected)
+        self._frames_label.setText(f"{len(self._history)}/{self._history.capacity()} frames")
+        self._slider.blockSignals(True)
+        self._slider.setRange(0, max(len(self._history) - 1, 0))
+        if self._selected is not None:
+            self._slider.setValue(self._selected - self._history.oldest_sequence())
+        self._slider.blockSignals(False)
+
+    def _changed_mode(self, mode):
+        logger.debug(f"Frame history mode changed to {mode}")
+        self._blink_timer.stop()
+        if mode == "blink":
+            self._blink_timer.start()
+        self._show_selected()
+
+    def _changed_position(self, index):
+        if not len(self._history):
+            return
+        self._selected = self._history.oldest_sequence() + index
+        if self.is_live():
+            self._mode_combo.setCurrentText("scrub")
+        self._show_selected()
+
+    def _changed_cap(self):
+        cap_mb = self._cap_spin.value()
+        if cap_mb == int(self._history.cap_mb()):
+            return
+        self._history.set_cap_mb(cap_mb)
+        self._selected = None
+        self._reference = None
+        self._update_slider()
+
+    def _set_reference(self):
+        self._reference = self._selected
+        logger.debug(f"Reference frame set to #{self._reference}")
+        self._show_selected()
+
+    def _reference_or_oldest(self):
+        if self._reference is not None and self._history.contains(self._reference):
+            return self._reference
+        return self._history.oldest_sequence()
+
+    def _blink(self):
+        self._blink_shows_reference = not self._blink_shows_reference
+        self._show_selected()
+
+    def _displayed(self, pixels, reference):
+        if pixels is None or not self._needs_stretch:
+            return pixels
+        if self._reference_statistics is None or self._reference_statistics[0] != reference:
+            self._reference_statistics = (reference, frame_statistics(self._history.frame(reference)))
+        return self._stretch.apply(pixels, self._reference_statistics[1])
+
+    def _show_selected(self):
+        mode = self._mode_combo.currentText()
+        if mode == "live" or self._selected is None:
+            return
+        reference = self._reference_or_oldest()
+        if mode == "difference":
+            # the decoded values are compared, a per-frame stretch would show up as a difference
+            pixels = self._history.difference(self._selected, reference)
+        elif mode == "blink" and self._blink_shows_reference:
+            pixels = self._displayed(self._history.frame(reference), reference)
+        else:
+            pixels = self._displayed(self._history.frame(self._selected), reference)
+        if pixels is None:
+            return
+        self._image_label.set_pixels(pixels)
+
+    def refresh(self):
+        pass
@@ -0,0 +1,140 @@
+import logging
+from threading import Thread, Condition, Event, Lock
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+logger = logging.getLogger(__name__)
+
+
+class LatestSlot:
+    def __init__(self):
+        self._condition = Condition()
+        self._item = None
+        self._closed = False
+
+    def put(self, item):
+        with self._condition:
+            replaced = self._item is not None
+            self._item = item
+            self._condition.notify()
+        return replaced
+
+    def take(self):
+        with self._condition:
+            while self._item is None and not self._closed:
+                self._condition.wait()
+            item = self._item
+            self._item = None
+            return item
+
+    def take_nowait(self):
+        with self._condition:
+            item = self._item
+            self._item = None
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class FramePipeline(QObject):
+    frame_ready = pyqtSignal(object)
+    _frame_available = pyqtSignal()
+
+    def __init__(self, fetch, decode, kill_event: Event):
+        super(FramePipeline, self).__init__()
+        self._fetch = fetch
+        self._decode = decode
+        self._kill_event = kill_event
+
+        self._fetch_trigger = Event()
+        self._decode_slot = LatestSlot()
+        self._display_slot = LatestSlot()
+        self._stopped = Event()
+
+        self._counters_lock = Lock()
+        self._counters = {"requested": 0, "skipped": 0, "fetched": 0, "decoded": 0, "delivered": 0, "dropped": 0}
+
+        self._frame_available.connect(self._deliver)
+        self._fetch_thread = Thread(target=self._fetch_loop, name="FrameFetch", daemon=True)
+        self._decode_thread = Thread(target=self._decode_loop, name="FrameDecode", daemon=True)
+        self._fetch_thread.start()
+        self._decode_thread.start()
+
+    def _count(self, name, n=1):
+        with self._counters_lock:
+            self._counters[name] += n
+
+    def counters(self):
+        with self._counters_lock:
+            return dict(self._counters)
+
+    def _should_stop(self):
+        return self._stopped.is_set() or (self._kill_event is not None and self._kill_event.is_set())
+
+    def request_frame(self):
+        if self._should_stop():
+            return
+        self._count("requested")
+        if self._fetch_trigger.is_set():
+            logger.debug("Previous frame request still pending, skipping this one")
+            self._count("skipped")
+            return
+        self._fetch_trigger.set()
+
+    def submit_payload(self, payload):
+        if self._should_stop():
+            return
+        self._count("fetched")
+        if self._decode_slot.put(payload):
+            logger.debug("Dropping stale frame waiting for decode")
+            self._count("dropped")
+
+    def _fetch_loop(self):
+        while True:
+            self._fetch_trigger.wait()
+            if self._should_stop():
+                break
+            try:
+                payload = self._fetch()
+            except Exception as e:
+                logger.error(f"Fetching frame failed: {e}")
+                payload = None
+            self._fetch_trigger.clear()
+            if payload is not None:
+                self.submit_payload(payload)
+        self._decode_slot.close()
+
+    def _decode_loop(self):
+        while True:
+            payload = self._decode_slot.take()
+            if payload is None or self._should_stop():
+                break
+            try:
+                frame = self._decode(payload)
+            except Exception as e:
+                logger.error(f"Decoding frame failed: {e}")
+                frame = None
+            if frame is None:
+                continue
+            self._count("decoded")
+            if self._display_slot.put(frame):
+                logger.debug("Dropping stale frame waiting for display")
+                self._count("dropped")
+            else:
+                self._frame_available.emit()
+
+    def _deliver(self):
+        frame = self._display_slot.take_nowait()
+        if frame is None or self._should_stop():
+            return
+        self._count("delivered")
+        self.frame_ready.emit(frame)
+
+    def stop(self):
+        self._stopped.set()
+        self._fetch_trigger.set()
+        self._decode_slot.close()
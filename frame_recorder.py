@@ -0,0 +1,240 @@
+import csv
+import io
+import logging
+import os
+from queue import Queue, Empty
+from threading import Thread, Lock, Event
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+recording_formats = ["npy", "fits"]
+default_frames_per_cube = 100
+default_queue_length = 8
+# how often an idle writer checks whether the application is shutting down
+kill_check_interval_s = 0.5
+index_file_name = "index.csv"
+index_columns = ["frame", "file", "slot", "timestamp", "exposure", "gain", "temperature"]
+
+fits_block = 2880
+fits_card = 80
+
+
+class NpyCube:
+    extension = "npy"
+
+    def __init__(self, path, shape, dtype, frames):
+        self.path = path
+        self._dtype = np.dtype(dtype)
+        self._shape = tuple(shape)
+        self._frames = np.lib.format.open_memmap(path, mode="w+", dtype=self._dtype, shape=(frames,) + self._shape)
+
+    def write(self, slot, pixels):
+        self._frames[slot] = pixels
+
+    def close(self, count):
+        self._frames.flush()
+        del self._frames
+        with open(self.path, "r+b") as f:
+            np.lib.format.read_magic(f)
+            np.lib.format.read_array_header_1_0(f)
+            data_offset = f.tell()
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {"descr": np.lib.format.dtype_to_descr(self._dtype),
+                                                          "fortran_order": False,
+                                                          "shape": (count,) + self._shape})
+            # numpy pads the header so that the first axis can grow in place, so the length should match
+            if header.tell() != data_offset:
+                logger.warning(f"Could not shrink {self.path} to {count} frames, unused frames are left in it")
+                return
+            f.seek(0)
+            f.write(header.getvalue())
+            f.truncate(data_offset + count * int(np.prod(self._shape)) * self._dtype.itemsize)
+
+
+def _fits_header(cards):
+    lines = []
+    for key, value in cards:
+        lines.append(f"{key:<8}= {value:>20}".ljust(fits_card))
+    lines.append("END".ljust(fits_card))
+    header = "".join(lines)
+    padded = -(-len(header) // fits_block) * fits_block
+    return header.ljust(padded).encode("ascii")
+
+
+class FitsCube:
+    extension = "fits"
+
+    def __init__(self, path, shape, dtype, frames):
+        self.path = path
+        self._shape = tuple(shape)
+        self._is16b = np.dtype(dtype) == np.uint16
+        self._header_size = len(self._header(frames))
+        # FITS stores big endian signed integers, 16 bit frames are offset by BZERO
+        file_dtype = ">i2" if self._is16b else "u1"
+        frame_bytes = int(np.prod(self._shape)) * np.dtype(file_dtype).itemsize
+        with open(path, "wb") as f:
+            f.write(self._header(frames))
+            f.truncate(self._header_size + frames * frame_bytes)
+        self._frames = np.memmap(path, mode="r+", dtype=file_dtype, offset=self._header_size,
+                                 shape=(frames,) + self._shape)
+        self._signed = np.empty(self._shape, dtype=np.uint16) if self._is16b else None
+
+    def _header(self, frames):
+        h, w = self._shape
+        cards = [("SIMPLE", "T"), ("BITPIX", 16 if self._is16b else 8), ("NAXIS", 3),
+                 ("NAXIS1", w), ("NAXIS2", h), ("NAXIS3", frames)]
+        if self._is16b:
+            cards += [("BZERO", 32768), ("BSCALE", 1)]
+        return _fits_header(cards)
+
+    def write(self, slot, pixels):
+        if self._is16b:
+            np.bitwise_xor(pixels, 0x8000, out=self._signed)
+            self._frames[slot] = self._signed.view(np.int16)
+        else:
+            self._frames[slot] = pixels
+
+    def close(self, count):
+        self._frames.flush()
+        frame_bytes = self._frames[0].nbytes
+        del self._frames
+        data_size = count * frame_bytes
+        with open(self.path, "r+b") as f:
+            f.write(self._header(count))
+            f.truncate(self._header_size + data_size)
+            f.truncate(self._header_size + -(-data_size // fits_block) * fits_block)
+
+
+cube_types = {"npy": NpyCube, "fits": FitsCube}
+
+
+class FrameRecorder:
+    def __init__(self, directory, file_format="npy", frames_per_cube=default_frames_per_cube,
+                 queue_length=default_queue_length, kill_event: Event = None):
+        if file_format not in cube_types:
+            raise ValueError(f"Unknown recording format: {file_format}")
+        self._directory = directory
+        self._kill_event = kill_event
+        self._cube_type = cube_types[file_format]
+        self._frames_per_cube = frames_per_cube
+
+        # frames are copied into preallocated buffers, a full pool means the writer is behind
+        self._free_buffers = Queue()
+        self._buffers_count = queue_length
+        self._pending = Queue()
+        self._counters_lock = Lock()
+        self._counters = {"submitted": 0, "written": 0, "dropped": 0}
+
+        self._cube = None
+        self._cube_shape = None
+        self._cube_index = 0
+        self._cube_count = 0
+        self._index_file = None
+        self._index_writer = None
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self._directory, exist_ok=True)
+        logger.info(f"Recording frames to {self._directory}")
+        self._index_file = open(os.path.join(self._directory, index_file_name), "w", newline="")
+        self._index_writer = csv.writer(self._index_file)
+        self._index_writer.writerow(index_columns)
+        # not a daemon, so the application waits for queued frames to be written and the files to be closed
+        self._thread = Thread(target=self._write_loop, name="FrameRecorder")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        logger.info(f"Stopping recording: {self.counters()}")
+        # frames already queued are still written before the files are closed
+        self._pending.put(None)
+
+    def _count(self, name, n=1):
+        with self._counters_lock:
+            self._counters[name] += n
+
+    def counters(self):
+        with self._counters_lock:
+            return dict(self._counters)
+
+    def _take_buffer(self, pixels):
+        try:
+            buffer = self._free_buffers.get_nowait()
+        except Empty:
+            with self._counters_lock:
+                if self._buffers_count == 0:
+                    return None
+                self._buffers_count -= 1
+            buffer = None
+        if buffer is None or buffer.shape != pixels.shape or buffer.dtype != pixels.dtype:
+            buffer = np.empty(pixels.shape, dtype=pixels.dtype)
+        return buffer
+
+    def submit(self, pixels, timestamp, metadata=None):
+        self._count("submitted")
+        buffer = self._take_buffer(pixels)
+        if buffer is None:
+            self._count("dropped")
+            logger.warning(f"Recorder is behind, dropping frame ({self.counters()['dropped']} dropped so far)")
+            return False
+        np.copyto(buffer, pixels)
+        self._pending.put((buffer, timestamp, metadata or {}))
+        return True
+
+    def _open_cube(self, pixels):
+        name = f"frames_{self._cube_index:04d}.{self._cube_type.extension}"
+        self._cube_index += 1
+        self._cube_count = 0
+        path = os.path.join(self._directory, name)
+        logger.debug(f"Opening recording cube {path} for {self._frames_per_cube} frames of shape {pixels.shape}")
+        self._cube = self._cube_type(path, pixels.shape, pixels.dtype, self._frames_per_cube)
+        self._cube_shape = (pixels.shape, pixels.dtype)
+
+    def _close_cube(self):
+        if self._cube is not None:
+            self._cube.close(self._cube_count)
+            self._cube = None
+
+    def _write(self, pixels, timestamp, metadata):
+        if self._cube is not None and (self._cube_count == self._frames_per_cube or
+                                       self._cube_shape != (pixels.shape, pixels.dtype)):
+            self._close_cube()
+        if self._cube is None:
+            self._open_cube(pixels)
+        self._cube.write(self._cube_count, pixels)
+        self._index_writer.writerow([self._counters["written"], os.path.basename(self._cube.path), self._cube_count,
+                                     f"{timestamp:.3f}", metadata.get("exposure", ""), metadata.get("gain", ""),
+                                     metadata.get("temperature", "")])
+        self._cube_count += 1
+        self._count("written")
+
+    def _next_item(self):
+        while True:
+            try:
+                return self._pending.get(timeout=kill_check_interval_s)
+            except Empty:
+                if self._kill_event is not None and self._kill_event.is_set():
+                    logger.info("Application is shutting down, finishing the recording")
+                    return None
+
+    def _write_loop(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                break
+            buffer, timestamp, metadata = item
+            try:
+                self._write(buffer, timestamp, metadata)
+            except Exception as e:
+                logger.error(f"Recording frame failed: {e}")
+                self._count("dropped")
+            self._free_buffers.put(buffer)
+        try:
+            self._close_cube()
+        finally:
+            self._index_file.close()
+        logger.info(f"Recording finished: {self.counters()}")
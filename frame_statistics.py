@@ -0,0 +1,68 @@
+import logging
+import math
+
+import numpy as np
+
+from fast_stretch import histogram_of, percentiles_from_histogram
+
+
+logger = logging.getLogger(__name__)
+
+
+# 0 keeps statistics exact, otherwise larger frames are sampled on a regular grid down to about this many pixels
+default_stats_max_pixels = 0
+
+
+def subsample_for(shape, max_pixels):
+    pixels = shape[0] * shape[1]
+    if not max_pixels or pixels <= max_pixels:
+        return 1
+    return math.ceil(math.sqrt(pixels / max_pixels))
+
+
+class FrameStatistics:
+    def __init__(self, histograms, subsample=1):
+        # everything below is derived from the histograms, so the frame itself is only read once
+        self.histograms = histograms
+        self.histogram = histograms["all"]
+        self.subsample = subsample
+        self._percentiles = {}
+
+        counts = self.histogram
+        self.count = int(counts.sum())
+        occupied = np.flatnonzero(counts)
+        self.minimum = int(occupied[0]) if len(occupied) else 0
+        self.maximum = int(occupied[-1]) if len(occupied) else 0
+        self.mean = float(np.dot(counts, np.arange(len(counts), dtype=np.float64)) / self.count) if self.count else 0.0
+        # pixels, or colour samples in RGB frames, at the top level of the format
+        self.saturated = int(counts[-1])
+
+    def levels(self):
+        return len(self.histogram)
+
+    def percentiles(self, qs):
+        missing = [q for q in qs if q not in self._percentiles]
+        if missing and self.count:
+            self._percentiles.update(zip(missing, percentiles_from_histogram(self.histogram, missing)))
+        return [self._percentiles.get(q, 0.0) for q in qs]
+
+    def median(self):
+        return self.percentiles((50,))[0]
+
+    def saturated_fraction(self):
+        return self.saturated / self.count if self.count else 0.0
+
+    def __str__(self):
+        estimated = f" (1/{self.subsample ** 2} sampled)" if self.subsample > 1 else ""
+        return (f"min {self.minimum}, max {self.maximum}, mean {self.mean:.1f}, median {self.median():.0f}, "
+                f"saturated {self.saturated_fraction():.2%}{estimated}")
+
+
+def frame_statistics(pixels, max_pixels=default_stats_max_pixels):
+    subsample = subsample_for(pixels.shape, max_pixels)
+    if pixels.ndim == 2:
+        return FrameStatistics({"all": histogram_of(pixels, subsample)}, subsample)
+
+    histograms = {name: histogram_of(pixels[:, :, i], subsample) for i, name in enumerate(["red", "green", "blue"])}
+    histograms["all"] = histograms["red"] + histograms["green"] + histograms["blue"]
+    return FrameStatistics(histograms, subsample)
@@ -0,0 +1,115 @@
+import logging
+import struct
+from threading import Thread, Event
+
+from frame_buffer_ring import FrameBufferRing, read_into
+
+
+logger = logging.getLogger(__name__)
+
+
+frame_header = struct.Struct("!4sQI")
+frame_magic = b"FRM1"
+stream_content_type = "application/x-frame-stream"
+
+
+class StreamUnsupported(Exception):
+    pass
+
+
+def read_exact(raw, size):
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = raw.read(remaining)
+        if not chunk:
+            raise EOFError(f"Frame stream ended with {remaining} of {size} bytes missing")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frames(raw, buffer_ring: FrameBufferRing = None):
+    while True:
+        magic, sequence, length = frame_header.unpack(read_exact(raw, frame_header.size))
+        if magic != frame_magic:
+            raise ValueError(f"Unexpected frame header magic: {magic}")
+        if buffer_ring is None:
+            yield sequence, read_exact(raw, length)
+            continue
+        payload = buffer_ring.acquire(length)
+        read_into(raw, payload)
+        yield sequence, payload
+
+
+class FrameStream:
+    def __init__(self, requester, send_as_jpg, on_frame, on_fallback, kill_event: Event, max_failures=3,
+                 reconnect_delay_s=1.0, buffer_ring: FrameBufferRing = None):
+        self._requester = requester
+        self._buffer_ring = buffer_ring
+        self._send_as_jpg = send_as_jpg
+        self._on_frame = on_frame
+        self._on_fallback = on_fallback
+        self._kill_event = kill_event
+        self._max_failures = max_failures
+        self._reconnect_delay_s = reconnect_delay_s
+        self._stop_event = Event()
+        self._response = None
+        self._thread = None
+
+    def _should_stop(self):
+        return self._stop_event.is_set() or (self._kill_event is not None and self._kill_event.is_set())
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="FrameStream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        response = self._response
+        if response is not None:
+            response.close()
+
+    def _receive(self):
+        response = self._requester.open_frame_stream(self._send_as_jpg)
+        if response is None:
+            raise ConnectionError("Could not open frame stream")
+        if response.status_code in (404, 405, 422) \
+                or not response.headers.get("Content-Type", "").startswith(stream_content_type):
+            response.close()
+            raise StreamUnsupported(f"Server does not stream frames (status code={response.status_code})")
+
+        self._response = response
+        logger.info("Frame stream opened")
+        try:
+            for sequence, payload in read_frames(response.raw, self._buffer_ring):
+                if self._should_stop():
+                    return
+                logger.debug(f"Received streamed frame #{sequence} of {len(payload)} bytes")
+                self._on_frame(payload)
+                yield
+        finally:
+            self._response = None
+            response.close()
+
+    def _run(self):
+        failures = 0
+        while not self._should_stop():
+            try:
+                for _ in self._receive():
+                    failures = 0
+            except StreamUnsupported as e:
+                logger.warning(f"{e}, falling back to polling")
+                self._on_fallback()
+                return
+            except Exception as e:
+                if self._should_stop():
+                    break
+                failures += 1
+                logger.warning(f"Frame stream interrupted ({failures}/{self._max_failures}): {e}")
+                if failures >= self._max_failures:
+                    logger.error("Frame stream keeps failing, falling back to polling")
+                    self._on_fallback()
+                    return
+                self._stop_event.wait(self._reconnect_delay_s * failures)
+        logger.debug("Frame stream stopped")
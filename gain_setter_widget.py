@@ -23,19 +23,29 @@ class GainSetter(QWidget):
         self.setLayout(self._layout)
         self.setMaximumSize(150, 50)
 
+    @staticmethod
+    def required_properties():
+        return ["get_gain"]
+
     def _refresh_impl(self):
-        is_ok, gain_raw = self._requester.get_gain()
+        self._requester.call(self._requester.get_gain(), self._show_gain)
+
+    def _show_gain(self, result):
+        is_ok, gain_raw = result
         if not is_ok:
             logger.error("Could not get current gain value!")
             return
         logger.debug(f"Acquired current gain: {gain_raw}")
         gain = int(gain_raw)
+        # the value read from the camera is not sent back to it
+        self._gain_spin.blockSignals(True)
         self._gain_spin.setValue(gain)
+        self._gain_spin.blockSignals(False)
 
     def _changed_gain(self, value):
         logger.debug(f"Setting gain to value: {value}")
         gain_str = str(value)
-        self._requester.set_gain(gain_str)
+        self._requester.call(self._requester.set_gain(gain_str))
 
     def refresh(self):
         logger.debug("Refreshing gain info...")
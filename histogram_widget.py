@@ -0,0 +1,97 @@
+import logging
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QCheckBox
+from PyQt5.QtGui import QPainter, QPainterPath, QColor, QPen
+from PyQt5.QtCore import Qt, QPointF
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+display_bins = 256
+channel_colors = {"all": "#cccccc", "red": "#dd4444", "green": "#44cc44", "blue": "#4477ee"}
+
+
+def rebin(counts, bins):
+    if len(counts) <= bins:
+        return counts
+    return counts[:len(counts) // bins * bins].reshape(bins, -1).sum(axis=1)
+
+
+class HistogramPlot(QWidget):
+    def __init__(self):
+        super(HistogramPlot, self).__init__()
+        self._histograms = {}
+        self._log_scale = False
+        self._per_channel = False
+
+    def set_histograms(self, histograms):
+        self._histograms = {name: rebin(counts, display_bins) for name, counts in histograms.items()}
+        self.update()
+
+    def set_log_scale(self, log_scale):
+        self._log_scale = log_scale
+        self.update()
+
+    def set_per_channel(self, per_channel):
+        self._per_channel = per_channel
+        self.update()
+
+    def _shown_channels(self):
+        if self._per_channel and len(self._histograms) > 1:
+            return [name for name in self._histograms if name != "all"]
+        return ["all"] if "all" in self._histograms else []
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#212121"))
+        channels = self._shown_channels()
+        if not channels:
+            return
+
+        w, h = self.width(), self.height()
+        values = {name: self._histograms[name].astype(np.float64) for name in channels}
+        if self._log_scale:
+            values = {name: np.log1p(v) for name, v in values.items()}
+        top = max(float(v.max()) for v in values.values()) or 1.0
+
+        painter.setRenderHint(QPainter.Antialiasing)
+        for name in channels:
+            v = values[name]
+            xs = np.linspace(0, w, len(v))
+            ys = h - (v / top) * (h - 1)
+            path = QPainterPath(QPointF(0, h))
+            for x, y in zip(xs, ys):
+                path.lineTo(x, y)
+            path.lineTo(w, h)
+            color = QColor(channel_colors.get(name, "#cccccc"))
+            painter.setPen(QPen(color, 1))
+            color.setAlpha(80)
+            painter.setBrush(color)
+            painter.drawPath(path)
+
+
+class HistogramWidget(QWidget):
+    def __init__(self, *args, **kwargs):
+        super(HistogramWidget, self).__init__(*args, **kwargs)
+        layout = QVBoxLayout()
+        options_layout = QHBoxLayout()
+
+        self._plot = HistogramPlot()
+
+        self._log_checkbox = QCheckBox("Log scale")
+        self._log_checkbox.toggled.connect(self._plot.set_log_scale)
+        self._channels_checkbox = QCheckBox("Per channel")
+        self._channels_checkbox.toggled.connect(self._plot.set_per_channel)
+
+        options_layout.addWidget(self._log_checkbox)
+        options_layout.addWidget(self._channels_checkbox, alignment=Qt.AlignLeft)
+
+        layout.addWidget(self._plot)
+        layout.addLayout(options_layout)
+        self.setLayout(layout)
+
+    def plot_histogram(self, histograms):
+        self._plot.set_histograms(histograms)
+        logger.debug("Histogram updated!")
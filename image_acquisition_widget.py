@@ -1,11 +1,23 @@
 import logging
 from PyQt5.QtWidgets import QWidget, QLabel, QComboBox, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QSpinBox, \
-    QProgressBar
+    QProgressBar, QCheckBox
 from PyQt5.QtGui import QImage
-from PyQt5.QtCore import Qt
-from utils import start_interval_polling
-from threading import Event
-from time import time
+from PyQt5.QtCore import Qt, pyqtSignal
+from frame_pipeline import FramePipeline
+from frame_stream import FrameStream
+from display_stretch import DisplayStretch
+from image_pyramid import ImagePyramid
+from frame_statistics import FrameStatistics, frame_statistics, default_stats_max_pixels
+from frame_geometry import FrameGeometry, FrameRegion
+from frame_compression import available_codecs, receive_frame
+from frame_buffer_ring import FrameBufferRing
+from frame_recorder import FrameRecorder, recording_formats
+from live_stack import LiveStack, default_clip_kappa
+from polling_scheduler import PollingScheduler
+from frame_freshness import polling_interval_s, sequence_from_headers, wait_timeout_s
+from threading import Event, Lock
+from time import perf_counter, time, strftime
+import os
 
 import numpy as np
 
@@ -13,54 +25,110 @@ import numpy as np
 logger = logging.getLogger(__name__)
 
 
-def normalize_image(img, is16b=False):
-    a = np.percentile(img, 5)
-    b = np.percentile(img, 95)
-    normalized = (img - a) / (b - a)
-    maxv = 65536 if is16b else 256
-    typv = np.uint16 if is16b else np.uint8
-    return np.clip(maxv * normalized, 0, maxv-1).astype(typv)
+long_poll_interval_s = 0.1
+# panels hidden in the dashboard keep polling, just rarely
+background_polling_interval_s = 5.0
+# a small region of interest is cheap to transfer, so it is polled as often as the exposure allows
+roi_polling_interval_s = 0.05
+roi_modes = ["full frame", "crop on server", "camera ROI"]
 
 
-def qimage_from_buffer(content, resolution, image_format):
-    logger.debug(f"Creating image with format {image_format}")
-    is16b = (image_format == "RAW16")
-    buffer_type = np.uint16 if is16b else np.uint8
-    image_format = QImage.Format_Grayscale16 if is16b else QImage.Format_Grayscale8
+class DecodedFrame:
+    def __init__(self, q_img, display, pixels, statistics: FrameStatistics, pyramid: ImagePyramid,
+                 transfer_stats=None, origin=(0, 0)):
+        self.q_img = q_img
+        # q_img may only wrap the display buffer, so it has to be kept alive along with it
+        self.display = display
+        self.pixels = pixels
+        self.statistics = statistics
+        self.pyramid = pyramid
+        self.transfer_stats = transfer_stats
+        # position of the frame within the full frame, not (0, 0) for regions of interest
+        self.origin = origin
+
+
+def pixels_from_buffer(content, geometry: FrameGeometry):
+    buffer_type = np.uint16 if geometry.bytes_per_pixel() == 2 else np.uint8
 
     img = np.frombuffer(content, dtype=buffer_type)
-    w, h = resolution
-    logger.debug(f"Reshaping into {w}x{h}...")
-    original_img = img.reshape(w, h)
-    logger.debug(f"dimension = {original_img.shape}, Max = {np.max(original_img)}, min = {np.min(original_img)}")
-    final_img = normalize_image(original_img, is16b=is16b)
-    logger.debug("Normalized!")
-    q_img = QImage(final_img.data, final_img.shape[0], final_img.shape[1], image_format)
+    logger.debug(f"Reshaping into {geometry}...")
+    return img.reshape(geometry.height, geometry.width)
+
+
+def qimage_from_pixels(pixels, stretch: DisplayStretch, statistics: FrameStatistics):
+    final_img = stretch.apply(pixels, statistics)
+    logger.debug(f"Stretched with {stretch.mode()}!")
+    h, w = final_img.shape
+    q_img = QImage(final_img.data, w, h, final_img.strides[0], QImage.Format_Grayscale8)
     return q_img, final_img
 
 
-def qimage_from_jpg(response):
+def qimage_from_jpg(content):
     logger.debug(f"Creating jpeg image from response...")
     image = QImage()
-    image.loadFromData(response.content)
+    image.loadFromData(content)
     logger.debug(f"...succeeded!")
-    return image
+    if image.isNull() or image.format() == QImage.Format_Grayscale8:
+        return image
+    return image.convertToFormat(QImage.Format_RGB32)
+
+
+def pixels_from_qimage(q_img):
+    w, h = q_img.width(), q_img.height()
+    ptr = q_img.constBits()
+    ptr.setsize(q_img.sizeInBytes())
+    rows = np.frombuffer(ptr, dtype=np.uint8).reshape(h, q_img.bytesPerLine())
+    if q_img.format() == QImage.Format_Grayscale8:
+        return rows[:, :w]
+    # Format_RGB32 is stored as BGRA in memory on little endian machines
+    return rows[:, :4 * w].reshape(h, w, 4)[:, :, 2::-1]
 
 
 class ImageAcquisition(QWidget):
-    def __init__(self, requester, format_chooser, image_label, hist_plotter, kill_event: Event):
+    # emitted from the frame stream thread, the fallback itself runs on the GUI thread
+    _stream_failed = pyqtSignal()
+
+    def __init__(self, requester, format_chooser, stretch_chooser, image_label, hist_plotter, frame_history,
+                 scheduler: PollingScheduler, kill_event: Event, stats_max_pixels=default_stats_max_pixels):
         super(ImageAcquisition, self).__init__()
         self._requester = requester
         self._format_chooser = format_chooser
+        self._stretch_chooser = stretch_chooser
         self._image_label = image_label
         self._hist_plotter = hist_plotter
+        self._frame_history = frame_history
         self._continuous_polling = False
-        self._polling_event = Event()
+        self._scheduler = scheduler
+        self._polling_task = None
+        self._requested_interval_s = None
+        self._wait_for_next = False
+        self._last_etag = None
+        self._last_sequence = None
         self._kill_event = kill_event
+        self._stats_max_pixels = stats_max_pixels
+        # the dashboard tells a hidden panel later, __init__ may already start polling a capturing camera
+        self._background = False
+        self._roi = None
+        self._camera_roi_lock = Lock()
+        self._shown_origin = (0, 0)
+        self._image_label.roi_drawn.connect(self._set_roi)
+        self._buffer_ring = FrameBufferRing()
+        # stage timings go next to the requester's endpoint timings, so one panel shows both
+        self._metrics = requester.metrics()
+        self._pipeline = FramePipeline(self._fetch_frame, self._decode_frame, kill_event)
+        self._pipeline.frame_ready.connect(self._show_frame)
+        self._image_label.set_metrics(self._metrics)
+        self._stream_failed.connect(self._fall_back_to_polling)
+
+        self._recorder = None
+        # raw frames are stacked on the decode thread while the button is checked
+        self._live_stack = LiveStack()
+        self._stacking = False
 
         self._layout = QVBoxLayout()
         top_layout = QHBoxLayout()
         bottom_layout = QHBoxLayout()
+        record_layout = QHBoxLayout()
 
         # self._get_last_image_button = QPushButton("Get last image", self)
         # self._get_last_image_button.setMaximumSize(100, 50)
@@ -77,6 +145,12 @@ class ImageAcquisition(QWidget):
         self._continuous_poll_cb.addItems(["0.5s", "1s", "2s"])
         self._continuous_poll_cb.setCurrentText("1s")
 
+        self._transport_cb = QComboBox()
+        self._transport_cb.setMaximumSize(100, 50)
+        self._transport_cb.addItems(["poll", "wait for next", "stream"])
+        self._transport_cb.setCurrentText("poll")
+        self._frame_stream = None
+
         self._save_button = QPushButton("Save images")
         self._save_button.setMaximumSize(100, 50)
         self._save_button.setCheckable(True)
@@ -101,7 +175,49 @@ class ImageAcquisition(QWidget):
         self._capture_type_cb.addItems(["light", "dark", "bias", "flat"])
         self._capture_type_cb.setCurrentText("light")
 
+        self._record_button = QPushButton("Record locally")
+        self._record_button.setMaximumSize(100, 50)
+        self._record_button.setCheckable(True)
+        self._record_button.setStyleSheet("background-color : black")
+        self._record_button.clicked.connect(self._start_recording)
+
+        self._record_format_cb = QComboBox()
+        self._record_format_cb.setMaximumSize(100, 50)
+        self._record_format_cb.addItems(recording_formats)
+
+        self._record_label = QLabel("Recorded: -")
+
+        roi_label = QLabel("ROI (shift+drag):")
+        roi_label.setMaximumSize(120, 50)
+        self._roi_cb = QComboBox()
+        self._roi_cb.setMaximumSize(120, 50)
+        self._roi_cb.addItems(roi_modes)
+        self._roi_cb.currentTextChanged.connect(self._apply_roi)
+        self._clear_roi_button = QPushButton("Clear ROI")
+        self._clear_roi_button.setMaximumSize(100, 50)
+        self._clear_roi_button.clicked.connect(self._clear_roi)
+        self._roi_size_label = QLabel("ROI: -")
+
+        self._stack_button = QPushButton("Live stack")
+        self._stack_button.setMaximumSize(100, 50)
+        self._stack_button.setCheckable(True)
+        self._stack_button.setStyleSheet("background-color : black")
+        self._stack_button.clicked.connect(self._start_stacking)
+        self._align_checkbox = QCheckBox("Align")
+        self._align_checkbox.setChecked(True)
+        self._align_checkbox.toggled.connect(self._live_stack.set_align)
+        self._clip_checkbox = QCheckBox(f"Clip at {default_clip_kappa:g} sigma")
+        self._clip_checkbox.toggled.connect(
+            lambda checked: self._live_stack.set_clip_kappa(default_clip_kappa if checked else None))
+        reset_stack_button = QPushButton("Reset stack")
+        reset_stack_button.setMaximumSize(100, 50)
+        reset_stack_button.clicked.connect(self._live_stack.reset)
+        self._stack_label = QLabel("Stacked: -")
+
         self._status_label = QLabel("Status: N/A")
+        self._frames_label = QLabel("Frames: -")
+        self._transfer_label = QLabel("Transfer: -")
+        self._stats_label = QLabel("Stats: -")
         self._refresh_impl()
 
         self._capture_progress_bar = QProgressBar()
@@ -114,6 +230,9 @@ class ImageAcquisition(QWidget):
         top_layout.addWidget(self._status_label)
         top_layout.addWidget(self._continuous_polling_button)
         top_layout.addWidget(self._continuous_poll_cb)
+        top_layout.addWidget(self._transport_cb)
+        top_layout.addWidget(self._frames_label)
+        top_layout.addWidget(self._transfer_label)
 
         bottom_layout.addWidget(self._save_button)
         bottom_layout.addWidget(self._saved_number_spin)
@@ -123,7 +242,25 @@ class ImageAcquisition(QWidget):
         bottom_layout.addWidget(self._capture_type_cb)
 
         self._layout.addLayout(top_layout)
+        self._layout.addWidget(self._stats_label)
+        record_layout.addWidget(self._record_button)
+        record_layout.addWidget(self._record_format_cb)
+        record_layout.addWidget(self._record_label)
+        record_layout.addWidget(roi_label)
+        record_layout.addWidget(self._roi_cb)
+        record_layout.addWidget(self._clear_roi_button)
+        record_layout.addWidget(self._roi_size_label)
+
+        stack_layout = QHBoxLayout()
+        stack_layout.addWidget(self._stack_button)
+        stack_layout.addWidget(self._align_checkbox)
+        stack_layout.addWidget(self._clip_checkbox)
+        stack_layout.addWidget(reset_stack_button)
+        stack_layout.addWidget(self._stack_label)
+
         self._layout.addLayout(bottom_layout)
+        self._layout.addLayout(record_layout)
+        self._layout.addLayout(stack_layout)
         self._layout.addWidget(self._capture_progress_bar)
         self.setLayout(self._layout)
 
@@ -131,6 +268,10 @@ class ImageAcquisition(QWidget):
     def refresh_rate_s():
         return 3
 
+    @staticmethod
+    def required_properties():
+        return ["get_status"]
+
     def _start_saving(self):
         button: QPushButton = self.sender()
         if button.isChecked():
@@ -150,53 +291,327 @@ class ImageAcquisition(QWidget):
             logger.debug("Stop saving clicked")
             self._stop_saving_impl()
 
-    def _get_last_image(self):
+    def _recording_metadata(self):
+        # taken with the frame on the fetching thread, so only what the state cache already holds is used
+        metadata = {}
+        for name, endpoint in [("exposure", "get_exposure"), ("gain", "get_gain"),
+                               ("temperature", "get_ccdtemperature")]:
+            is_ok, value = self._requester.cached_value(endpoint)
+            if is_ok:
+                metadata[name] = value
+        return metadata
+
+    def _start_recording(self):
+        button: QPushButton = self.sender()
+        if button.isChecked():
+            directory = os.path.join("recordings", self._save_dir_edit.text(),
+                                     f"{self._capture_type_cb.currentText()}_{strftime('%Y%m%d_%H%M%S')}")
+            self._recorder = FrameRecorder(directory, self._record_format_cb.currentText(),
+                                           kill_event=self._kill_event).start()
+            button.setStyleSheet("background-color : #228822")
+            self._record_format_cb.setDisabled(True)
+        else:
+            self._stop_recording()
+
+    def _start_stacking(self):
+        button: QPushButton = self.sender()
+        self._stacking = button.isChecked()
+        button.setStyleSheet("background-color : #228822" if self._stacking else "background-color : black")
+        if self._stacking:
+            # every run starts from an empty stack, the previous one would not match the sky anymore
+            self._live_stack.reset()
+        else:
+            self._live_stack.release()
+            self._stack_label.setText("Stacked: -")
+
+    def _stop_recording(self):
+        if self._recorder is not None:
+            self._recorder.stop()
+            self._recorder = None
+        self._record_button.setChecked(False)
+        self._record_button.setStyleSheet("background-color : black")
+        self._record_format_cb.setEnabled(True)
+
+    def _fetch_frame(self):
         logger.debug("Getting last image")
         send_as_jpg = self._format_chooser.should_send_jpg()
+        geometry = None
+        if not send_as_jpg:
+            geometry = self._requester.get_frame_geometry()
+            if geometry is None:
+                logger.error("Could not get required image parameters from camera")
+                return None
+        region, origin = self._region_to_fetch(geometry)
+        if region is not None and geometry is not None:
+            geometry = geometry.cropped(region)
+
+        compression = available_codecs() if self._format_chooser.should_compress_raw() else None
+        is_ok, exposure_us = self._requester.get_exposure()
+        exposure_us = exposure_us if is_ok else None
+        wait_after = None
+        if self._wait_for_next:
+            wait_after = self._last_sequence if self._last_sequence is not None else -1
+        else:
+            self._adjust_polling_interval(exposure_us)
+
+        start_time = perf_counter()
+        response = self._requester.get_last_image(send_as_jpg, compression, self._last_etag, wait_after,
+                                                  wait_timeout_s(exposure_us), region)
+        if response is None:
+            return None
+        if response.status_code == 304:
+            logger.debug("Frame did not change since the last fetch")
+            response.close()
+            return None
+        etag = response.headers.get("ETag")
+        sequence = sequence_from_headers(response.headers)
+        try:
+            content, transfer_stats = receive_frame(response, None if send_as_jpg else self._buffer_ring)
+        except Exception as e:
+            logger.error(f"Receiving frame failed: {e}")
+            self._forget_last_frame()
+            return None
+        self._metrics.record_stage("fetch", perf_counter() - start_time)
+        payload = self._payload_from_content(send_as_jpg, content, geometry, transfer_stats, origin, region)
+        if payload is None:
+            self._forget_last_frame()
+            return None
+        # only a frame that made it this far may be skipped by the next poll
+        self._last_etag = etag
+        self._last_sequence = sequence
+        return payload
+
+    def _forget_last_frame(self):
+        # the next poll then gets the current frame again instead of a 304 for a frame never shown
+        self._last_etag = None
+        self._last_sequence = None
+
+    def _region_to_fetch(self, geometry):
+        # the region cropped on the server, if any, and where the fetched frame lies in the full frame
+        camera_roi = self._requester.camera_roi()
+        if camera_roi is not None:
+            return None, camera_roi.origin()
+        if self._roi is None or self._roi_cb.currentText() != "crop on server":
+            return None, (0, 0)
+        region = self._roi if geometry is None else self._roi.clamped(geometry.width, geometry.height)
+        if region is None:
+            return None, (0, 0)
+        return region, region.origin()
+
+    def _payload_from_content(self, send_as_jpg, content, geometry, transfer_stats=None, origin=(0, 0),
+                              region=None):
+        if geometry is not None and not geometry.matches_payload(len(content)):
+            logger.warning(f"Frame of {len(content)} bytes does not match {geometry}, refreshing geometry")
+            self._requester.invalidate_frame_geometry()
+            geometry = self._requester.get_frame_geometry()
+            # a frame cropped on the server is only the requested region of the refreshed geometry
+            if region is not None and geometry is not None:
+                region = region.clamped(geometry.width, geometry.height)
+                geometry = geometry.cropped(region) if region is not None else None
+            if geometry is None or not geometry.matches_payload(len(content)):
+                logger.error(f"Dropping frame of {len(content)} bytes not matching {geometry}")
+                return None
+        recorder = self._recorder
+        if recorder is not None and not send_as_jpg:
+            # the recorder copies the frame and writes it on its own thread, a busy writer drops frames instead
+            recorder.submit(pixels_from_buffer(content, geometry), time(), self._recording_metadata())
+        return send_as_jpg, content, geometry, transfer_stats, origin
+
+    def _on_streamed_frame(self, send_as_jpg, content):
+        self._metrics.record_bytes("stream_frames", len(content))
+        geometry = None if send_as_jpg else self._requester.get_frame_geometry()
+        # streams are never cropped on the server, only a camera ROI applies to them
+        camera_roi = self._requester.camera_roi()
+        origin = camera_roi.origin() if camera_roi is not None else (0, 0)
+        payload = self._payload_from_content(send_as_jpg, content, geometry, origin=origin)
+        if payload is not None:
+            self._pipeline.submit_payload(payload)
+
+    def _start_streaming(self):
+        send_as_jpg = self._format_chooser.should_send_jpg()
+        logger.debug(f"Starting to stream new images, jpg={send_as_jpg}")
+        self._frame_stream = FrameStream(self._requester, send_as_jpg,
+                                         lambda content: self._on_streamed_frame(send_as_jpg, content),
+                                         self._stream_failed.emit, self._kill_event,
+                                         buffer_ring=None if send_as_jpg else self._buffer_ring)
+        self._frame_stream.start()
+
+    def _fall_back_to_polling(self):
+        logger.warning("Streaming unavailable, polling for images instead")
+        self._frame_stream = None
+        self._start_polling()
+
+    def set_background(self, background):
+        logger.debug(f"Image acquisition {'moved to background' if background else 'in foreground'}")
+        self._background = background
+        if self._wait_for_next:
+            self._adjust_polling_interval(None)
+
+    def _adjust_polling_interval(self, exposure_us):
+        task = self._polling_task
+        if task is None or self._requested_interval_s is None:
+            return
+        if self._wait_for_next:
+            interval = long_poll_interval_s
+        elif self._roi_active():
+            interval = polling_interval_s(min(self._requested_interval_s, roi_polling_interval_s), exposure_us)
+        else:
+            interval = polling_interval_s(self._requested_interval_s, exposure_us)
+        if self._background:
+            interval = max(interval, background_polling_interval_s)
+        if interval != task.interval_s:
+            logger.debug(f"Polling every {interval}s for exposure of {exposure_us}us")
+            task.set_interval(interval)
+
+    def _start_polling(self):
+        interval_str = self._continuous_poll_cb.currentText()
+        self._wait_for_next = self._transport_cb.currentText() == "wait for next"
+        self._last_etag = None
+        self._last_sequence = None
+        self._requested_interval_s = float(interval_str[:-1])
+        # when waiting for the next frame the request itself blocks until readout, so it is renewed right away
+        interval = long_poll_interval_s if self._wait_for_next else self._requested_interval_s
+        if self._background:
+            interval = max(interval, background_polling_interval_s)
+        logger.debug(f"Starting to poll for new images with interval {interval}s, wait={self._wait_for_next}")
+        # frames keep a steady cadence, the pipeline itself skips a request while a fetch is pending
+        self._polling_task = self._scheduler.schedule(self._pipeline.request_frame, interval, jitter_s=0,
+                                                      name="image polling")
+
+    def _stop_receiving(self):
+        if self._polling_task is not None:
+            self._polling_task.cancel()
+            self._polling_task = None
+        if self._frame_stream is not None:
+            self._frame_stream.stop()
+            self._frame_stream = None
+
+    def stop(self):
+        self._stop_receiving()
+        self._stop_recording()
+        self._pipeline.stop()
+
+    def _decode_frame(self, payload):
+        send_as_jpg, content, geometry, transfer_stats, origin = payload
+        start_time = perf_counter()
         if send_as_jpg:
-            logger.debug("Image will be send as jpg")
-            start_time = time()
-            response = self._requester.get_last_image(send_as_jpg)
-            time_elapsed = time() - start_time
-            logger.debug(f"Time elapsed on receiving response: {time_elapsed}")
-            start_time = time()
-            q_img = qimage_from_jpg(response)
-
+            q_img = qimage_from_jpg(content)
+            if q_img.isNull():
+                return None
+            display = None
+            pixels = pixels_from_qimage(q_img)
+            statistics_start = perf_counter()
+            self._metrics.record_stage("decode", statistics_start - start_time)
+            statistics = frame_statistics(pixels, self._stats_max_pixels)
+            self._metrics.record_stage("statistics", perf_counter() - statistics_start)
         else:
-            logger.debug("Image will be send raw")
-            is_ok1, (w, h) = self._requester.get_resolution()
-            is_ok2, current_format = self._requester.get_current_format()
-            if not is_ok1 or not is_ok2:
-                logger.error("Could not get required image parameters from camera")
-                return
-            start_time = time()
-            response = self.requester.get_last_image(self._send_as_jpg)
-            time_elapsed = time() - start_time
-            logger.debug(f"Time elapsed on receiving response: {time_elapsed}")
-            start_time = time()
-            logger.debug("Acquired response!")
-            if response is None:
-                return
-            q_img = qimage_from_buffer(response.content, [w, h], current_format)
-
-        if q_img is not None:
+            pixels = pixels_from_buffer(content, geometry)
+            self._metrics.record_stage("decode", perf_counter() - start_time)
+            if self._stacking:
+                stack_start = perf_counter()
+                pixels = self._live_stack.add(pixels)
+                self._metrics.record_stage("stack", perf_counter() - stack_start)
+            else:
+                # a frame decoded while stacking was switched off may have allocated the buffers again
+                self._live_stack.release()
+            statistics_start = perf_counter()
+            statistics = frame_statistics(pixels, self._stats_max_pixels)
+            stretch_start = perf_counter()
+            self._metrics.record_stage("statistics", stretch_start - statistics_start)
+            q_img, display = qimage_from_pixels(pixels, self._stretch_chooser.stretch(), statistics)
+            self._metrics.record_stage("stretch", perf_counter() - stretch_start)
+        return DecodedFrame(q_img, display, pixels, statistics, self._pyramid_for(q_img, display, pixels),
+                            transfer_stats, origin)
+
+    def _pyramid_for(self, q_img, display, pixels):
+        # display is one of the stretch's reused output buffers and would be overwritten while still shown,
+        # so the pyramid gets its own copy; JPEG pixels only view the decoded QImage, which the pyramid keeps alive
+        pyramid = ImagePyramid(display.copy()) if display is not None else ImagePyramid(pixels, q_img)
+        if not self._background:
+            # the level the view will paint is binned here rather than on the GUI thread
+            start_time = perf_counter()
+            pyramid.prepare(self._image_label.scale_for(pyramid.width(), pyramid.height()))
+            self._metrics.record_stage("decimate", perf_counter() - start_time)
+        return pyramid
+
+    def _show_frame(self, frame: DecodedFrame):
+        self._frame_history.add_frame(frame, self._stretch_chooser.stretch().mode())
+        if self._background:
+            # nobody sees a hidden panel, so its frames only go to the history
+            return
+        start_time = perf_counter()
+        if self._frame_history.is_live():
             logger.debug("Setting new image...")
-            self._image_label.set_image(q_img)
-            if send_as_jpg:
-                self._hist_plotter.plot_histogram(response.content)
-
-        time_elapsed = time() - start_time
-        logger.debug(f"Time elapsed on processing: {time_elapsed}")
+            self._image_label.set_pyramid(frame.pyramid)
+            self._shown_origin = frame.origin
+        self._hist_plotter.plot_histogram(frame.statistics.histograms)
+        self._stats_label.setText(f"Stats: {frame.statistics}")
+        # handing the frame over, the view times its own painting
+        self._metrics.record_stage("show", perf_counter() - start_time)
+
+        counters = self._pipeline.counters()
+        self._frames_label.setText(f"Frames: {counters['delivered']} shown, {counters['dropped']} dropped")
+        if frame.transfer_stats is not None:
+            self._transfer_label.setText(f"Transfer: {frame.transfer_stats}")
+        if self._stacking:
+            stacked = self._live_stack.counters()
+            self._stack_label.setText(f"Stacked: {stacked['frames']}, rejected: {stacked['rejected']}, "
+                                      f"misaligned: {stacked['misaligned']}, shift: {stacked['shift']}")
+        if self._recorder is not None:
+            recorded = self._recorder.counters()
+            self._record_label.setText(f"Recorded: {recorded['written']}, dropped: {recorded['dropped']}")
+
+    def _roi_active(self):
+        return self._roi is not None and self._roi_cb.currentText() != "full frame"
+
+    def _set_roi(self, x, y, width, height):
+        # drawn on whatever is shown, which may itself be a region of the full frame
+        self._roi = FrameRegion(x, y, width, height).offset(*self._shown_origin)
+        self._apply_roi()
+
+    def _clear_roi(self):
+        self._roi = None
+        self._apply_roi()
+
+    def _apply_camera_roi(self, mode, roi):
+        # runs on a scheduler worker, changing the subframe takes several requests
+        with self._camera_roi_lock:
+            if self._requester.camera_roi() is not None and (mode != "camera ROI" or roi is None):
+                self._requester.clear_camera_roi()
+            if mode == "camera ROI" and roi is not None and self._requester.camera_roi() != roi:
+                if not self._requester.set_camera_roi(roi):
+                    logger.error(f"Camera did not accept region of interest {roi}")
+            # a region is a different representation of the same frame, so a cached tag no longer applies
+            self._forget_last_frame()
+
+    def _on_camera_roi_applied(self, future):
+        exception = future.exception()
+        if exception is not None:
+            logger.error(f"Applying region of interest failed: {exception}")
+
+    def _apply_roi(self):
+        mode = self._roi_cb.currentText()
+        logger.debug(f"Region of interest {self._roi} in mode {mode}")
+        self._scheduler.submit(self._apply_camera_roi, mode, self._roi).add_done_callback(self._on_camera_roi_applied)
+        # frames of another region do not line up with the stacked ones
+        self._live_stack.reset()
+        self._roi_size_label.setText(f"ROI: {self._roi.width}x{self._roi.height}" if self._roi is not None
+                                     else "ROI: -")
+        # the outline is shown while the region is not applied, afterwards the view shows just the region
+        self._image_label.set_roi_overlay(self._roi if mode == "full frame" else None)
+        self._adjust_polling_interval(None)
 
     def _set_button_for_capture(self, button):
         button.setChecked(True)
         button.setStyleSheet("background-color : #228822")
-        interval_str = self._continuous_poll_cb.currentText()
+        if self._continuous_polling:
+            return
         self._continuous_poll_cb.setDisabled(True)
-        logger.debug(f"Starting to poll for new images with interval {interval_str}")
-        interval = float(interval_str[:-1])
-        self._polling_event.clear()
-        start_interval_polling(self._polling_event, self._get_last_image, interval, self._kill_event)
+        self._transport_cb.setDisabled(True)
+        if self._transport_cb.currentText() == "stream":
+            self._start_streaming()
+        else:
+            self._start_polling()
         self._continuous_polling = True
         self._save_button.setEnabled(True)
 
@@ -216,9 +631,11 @@ class ImageAcquisition(QWidget):
 
             self._requester.stop_capturing()
             button.setStyleSheet("background-color : black")
-            self._polling_event.set()
+            self._stop_receiving()
+            self._stop_recording()
             self._continuous_polling = False
             self._continuous_poll_cb.setEnabled(True)
+            self._transport_cb.setEnabled(True)
 
     def _saving_button_off(self):
         self._save_button.setChecked(False)
@@ -0,0 +1,87 @@
+import logging
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+tile_size = 512
+# levels are only built down to about this size, the painter scales the last one further if needed
+smallest_level_size = 128
+
+
+def bin2x2(pixels):
+    # area average of each 2x2 block, an odd last row or column is dropped
+    h, w = pixels.shape[0] // 2 * 2, pixels.shape[1] // 2 * 2
+    total = pixels[0:h:2, 0:w:2].astype(np.uint16)
+    total += pixels[1:h:2, 0:w:2]
+    total += pixels[0:h:2, 1:w:2]
+    total += pixels[1:h:2, 1:w:2]
+    total += 2
+    total >>= 2
+    return total.astype(np.uint8)
+
+
+class ImagePyramid:
+    def __init__(self, pixels, owner=None):
+        # pixels are 8-bit display values, grey (h, w) or RGB (h, w, 3), and must not change while shown
+        self._levels = [pixels]
+        # whatever holds the memory pixels only view, e.g. the QImage a JPEG frame was decoded into
+        self._owner = owner
+        self._tiles = {}
+
+    def width(self):
+        return self._levels[0].shape[1]
+
+    def height(self):
+        return self._levels[0].shape[0]
+
+    def is_color(self):
+        return self._levels[0].ndim == 3
+
+    def max_level(self):
+        size = max(self.width(), self.height())
+        level = 0
+        while size > smallest_level_size:
+            size //= 2
+            level += 1
+        return level
+
+    def level_for_scale(self, scale):
+        # the coarsest level still at least as detailed as the screen, so the painter only ever scales down < 2x
+        level = 0
+        while level < self.max_level() and scale * 2 ** (level + 1) <= 1.0:
+            level += 1
+        return level
+
+    def level(self, index):
+        # levels are binned lazily, each from the one above it
+        while len(self._levels) <= index:
+            self._levels.append(bin2x2(self._levels[-1]))
+        return self._levels[index]
+
+    def tile(self, index, column, row):
+        key = (index, column, row)
+        tile = self._tiles.get(key)
+        if tile is None:
+            pixels = self.level(index)
+            y, x = row * tile_size, column * tile_size
+            tile = self._tiles[key] = np.ascontiguousarray(pixels[y:y + tile_size, x:x + tile_size])
+        return tile
+
+    def visible_tiles(self, index, left, top, right, bottom):
+        # tiles of the level covering the given rectangle, given in full resolution pixels
+        pixels = self.level(index)
+        factor = 2 ** index
+        h, w = pixels.shape[:2]
+        first_column = max(0, int(left / factor) // tile_size)
+        last_column = min((w - 1) // tile_size, int(right / factor) // tile_size)
+        first_row = max(0, int(top / factor) // tile_size)
+        last_row = min((h - 1) // tile_size, int(bottom / factor) // tile_size)
+        return [(column, row) for row in range(first_row, last_row + 1)
+                for column in range(first_column, last_column + 1)]
+
+    def prepare(self, scale):
+        # builds the level needed for the given display scale ahead of painting, e.g. on the decode thread
+        return self.level(self.level_for_scale(scale))
@@ -1,18 +1,26 @@
 from PyQt5.QtWidgets import QInputDialog, QLabel, QLineEdit, QHBoxLayout, QWidget, QVBoxLayout, QPushButton, QComboBox
 import logging
-from camera_requester import port_for_cameras, standalone_get_request, standalone_post_request
+from camera_requester import server_url, standalone_get_request, standalone_post_request
 from config_manager import save_config
+from connection_pool import ConnectionPool
+from event_loop_thread import EventLoopThread
+import ipaddress
 
 
 logger = logging.getLogger(__name__)
 
 
 class LauncherView(QWidget):
-    def __init__(self, config, connect_callback, error_prompt):
+    def __init__(self, config, connect_callback, error_prompt, pool: ConnectionPool = None,
+                 loop_thread: EventLoopThread = None):
         super(LauncherView, self).__init__()
         self._config = config
         self._connect_callback = connect_callback
         self._error_prompt = error_prompt
+        self._pool = pool
+        self._loop_thread = loop_thread
+        self._discovery = None
+        self._server_address = None
 
         self._prepare_ui()
 
@@ -22,6 +30,7 @@ class LauncherView(QWidget):
         layout3 = QHBoxLayout()
         layout4 = QHBoxLayout()
         layout5 = QHBoxLayout()
+        discovery_layout = QHBoxLayout()
 
         self._preset_ip_combo = QComboBox()
         self._preset_ip_items = self._read_preset_ips()
@@ -48,6 +57,20 @@ class LauncherView(QWidget):
 
         self._main_layout.addLayout(layout3)
 
+        self._subnet_edit = QLineEdit(self._read_discovery_subnet(), self)
+        self._subnet_edit.setPlaceholderText("subnet, e.g. 192.168.1.0/24")
+        self._discover_button = QPushButton("Discover", self)
+        self._discover_button.clicked.connect(self._discover_servers)
+        self._discovered_combo = QComboBox()
+        self._discovered_combo.setMinimumWidth(150)
+        self._discovered_combo.activated.connect(self._choose_discovered)
+
+        discovery_layout.addWidget(QLabel('Or discover in:', self))
+        discovery_layout.addWidget(self._subnet_edit)
+        discovery_layout.addWidget(self._discover_button)
+        discovery_layout.addWidget(self._discovered_combo)
+        self._main_layout.addLayout(discovery_layout)
+
         self._camera_chooser_combo = QComboBox()
 
         connect_ip_button = QPushButton("Get cameras list", self)
@@ -80,6 +103,56 @@ class LauncherView(QWidget):
         logger.debug(f"Read preset ids = {d}")
         return d
 
+    def _read_discovery_subnet(self):
+        subnet = self._config.get("discovery", {}).get("subnet")
+        if subnet:
+            return subnet
+        try:
+            return str(ipaddress.ip_network(f"{self._get_ip_initial_text()}/24", strict=False))
+        except ValueError:
+            return ""
+
+    def _discover_servers(self):
+        # aiohttp is only loaded once discovery is actually used
+        from camera_discovery import CameraDiscovery, discovery_targets
+        if self._discovery is None:
+            if self._loop_thread is None:
+                self._loop_thread = EventLoopThread()
+            self._discovery = CameraDiscovery.from_config(self._config, self._loop_thread)
+        subnet = self._subnet_edit.text().strip() or None
+        ports = self._config.get("discovery", {}).get("ports")
+        try:
+            addresses = discovery_targets(self._config.get("saved_ips", {}).values(), subnet, ports)
+        except ValueError as e:
+            self._error_prompt(f"Invalid subnet {subnet}: {e}")
+            return
+        self._discovered_combo.clear()
+        self._discover_button.setEnabled(False)
+        self._discover_button.setText("Discovering...")
+        self._discovery.start(addresses, self._add_discovered, self._discovery_finished)
+
+    def _add_discovered(self, server):
+        self._discovered_combo.addItem(str(server), server)
+        if self._discovered_combo.count() == 1:
+            self._choose_discovered(0)
+
+    def _discovery_finished(self, found):
+        self._discover_button.setEnabled(True)
+        self._discover_button.setText("Discover")
+        if not found:
+            self._error_prompt("No camera servers found")
+
+    def _choose_discovered(self, index):
+        server = self._discovered_combo.itemData(index)
+        if server is not None:
+            self._set_cameras_list(server.address, server.cameras)
+
+    def _set_cameras_list(self, address, cameras_list):
+        self._server_address = address
+        self._camera_chooser_combo.clear()
+        self._camera_chooser_combo.addItems(cameras_list)
+        self._connect_camera_button.setEnabled(len(cameras_list) > 0)
+
     def _load_ip_from_preset(self, t):
         new_ip = self._preset_ip_items[t]
         logger.debug(f"New ip chosen from preset {t}: {new_ip}")
@@ -94,30 +167,28 @@ class LauncherView(QWidget):
 
     def _get_cameras_list(self):
         try_ip = self._ip_edit.text()
-        full_url = f"http://{try_ip}:{port_for_cameras}/cameras_list"
-        response = standalone_get_request(full_url, self._error_prompt)
+        full_url = f"{server_url(try_ip)}/cameras_list"
+        response = standalone_get_request(full_url, self._error_prompt, self._pool)
         if response is None:
             return
 
         self._save_to_config({"last_used_ip": try_ip})
         cameras_list = response.json()["cameras"]
         logger.debug(f"Successfully got list of cameras at {try_ip} : {cameras_list}")
-        self._camera_chooser_combo.clear()
-        self._camera_chooser_combo.addItems(cameras_list)
-        self._connect_camera_button.setEnabled(len(cameras_list) > 0)
+        self._set_cameras_list(try_ip, cameras_list)
 
     def _connect_to_camera(self):
         camera_name = self._camera_chooser_combo.currentText()
         camera_index = self._camera_chooser_combo.currentIndex()
-        current_ip = self._ip_edit.text()
+        current_ip = self._server_address
         logger.debug(f"Connecting to camera {camera_name} at {current_ip}")
 
-        url = f"http://{current_ip}:{port_for_cameras}/camera/{camera_index}/init_camera"
+        url = f"{server_url(current_ip)}/camera/{camera_index}/init_camera"
         headers = {"Content-Type": "application/json; charset=utf-8"}
         data = {}
 
         logger.debug(f"About to call POST...")
-        response = standalone_post_request(url, headers, data, self._error_prompt)
+        response = standalone_post_request(url, headers, data, self._error_prompt, self._pool)
         if response is not None and response.status_code == 200:
             # self._init_guiding(camera_index, camera_name, current_ip)
             self._connect_callback(current_ip, camera_index, camera_name)
@@ -0,0 +1,280 @@
+import logging
+from threading import Lock
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+default_max_shift = 32
+default_clip_kappa = 3.0
+# pixels are only clipped once they have this many frames to estimate their spread from
+min_frames_for_clipping = 3
+# floor for the per-pixel sigma, so pixels that never changed do not reject every new value
+min_sigma = 1.0
+# frames are binned down to about this size before their shift is searched for
+align_size = 1024
+# pixels this many sigma above the sky are taken as stars, anything fainter is noise to the alignment
+star_threshold_sigmas = 3.0
+# the integer shift is refined at full resolution on windows around this many of the brightest stars
+refine_stars = 16
+refine_radius = 8
+# normalized correlation of the stars at the shift found, below it the frame is taken as not aligned
+min_peak_correlation = 0.3
+# per-pixel frame counts are 16 bit
+max_frames = 65535
+output_buffers_count = 3
+
+
+def _binned(pixels, factor):
+    # summed like the camera bins, strided adds are much faster than a reshaped mean
+    h, w = pixels.shape[0] // factor * factor, pixels.shape[1] // factor * factor
+    binned = np.zeros((h // factor, w // factor), dtype=np.float32)
+    for i in range(factor):
+        for j in range(factor):
+            binned += pixels[i:h:factor, j:w:factor]
+    return binned
+
+
+def _stars_only(image):
+    # sky and noise are cut away in place, so the alignment is driven by the stars alone
+    sample = image[::4, ::4] if image.size > 1 << 18 else image
+    sky, upper = np.percentile(sample, (50, 84.13))
+    image -= sky + star_threshold_sigmas * max(upper - sky, 1e-3)
+    np.maximum(image, 0, out=image)
+    return image
+
+
+def _fft_size(n):
+    # smallest size of at least n with no prime factor above 5, where the FFT is fast
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def _brightest(image, count, radius):
+    # peaks of the brightest stars, each found one hides its neighbourhood from the next search
+    image = image.copy()
+    peaks = []
+    for _ in range(count):
+        y, x = np.unravel_index(int(np.argmax(image)), image.shape)
+        if image[y, x] <= 0:
+            break
+        peaks.append((y, x))
+        image[max(y - radius, 0):y + radius + 1, max(x - radius, 0):x + radius + 1] = 0
+    return peaks
+
+
+def _overlap(shift, length):
+    # slices of the stack and of the frame covering the same sky for a frame drifted by shift pixels
+    if shift >= 0:
+        return slice(0, length - shift), slice(shift, length)
+    return slice(-shift, length), slice(0, length + shift)
+
+
+class LiveStack:
+    def __init__(self, align=True, clip_kappa=None, max_shift=default_max_shift):
+        self._lock = Lock()
+        self._align = align
+        self._clip_kappa = clip_kappa
+        self._max_shift = max_shift
+        self._shape = None
+        self._dtype = None
+        self._frames = 0
+        self._rejected = 0
+        self._last_shift = (0, 0)
+        self._misaligned = 0
+
+    def set_align(self, align):
+        # the alignment reference is taken from the first frame, so switching it starts a new stack
+        with self._lock:
+            if align != self._align:
+                self._frames = 0
+            self._align = align
+
+    def set_clip_kappa(self, clip_kappa):
+        # the spread is only tracked while clipping, so switching it on starts a new stack
+        with self._lock:
+            if (clip_kappa is None) != (self._clip_kappa is None):
+                self._frames = 0
+            self._clip_kappa = clip_kappa
+
+    def reset(self):
+        with self._lock:
+            logger.debug(f"Resetting live stack of {self._frames} frames")
+            self._frames = 0
+
+    def release(self):
+        # the buffers take about 26 bytes per pixel, they are allocated again by the next frame added
+        with self._lock:
+            if self._shape is None:
+                return
+            logger.debug(f"Releasing live stack buffers for frames of shape {self._shape}")
+            self._shape = None
+            self._dtype = None
+            self._frames = 0
+            self._mean = self._m2 = self._counts = self._delta = self._step = None
+            self._accepted = self._outlier = None
+            self._outputs = self._output = None
+            self._reference_spectrum = self._reference_windows = None
+
+    def counters(self):
+        return {"frames": self._frames, "rejected": self._rejected, "misaligned": self._misaligned,
+                "shift": self._last_shift}
+
+    def _allocate(self, shape, dtype):
+        logger.debug(f"Allocating live stack for frames of shape {shape}")
+        # everything the stack needs is allocated here once, memory does not grow with the number of frames
+        self._shape = shape
+        self._dtype = dtype
+        self._mean = np.zeros(shape, dtype=np.float32)
+        self._m2 = np.zeros(shape, dtype=np.float32)
+        self._counts = np.zeros(shape, dtype=np.uint16)
+        self._delta = np.empty(shape, dtype=np.float32)
+        self._step = np.empty(shape, dtype=np.float32)
+        self._accepted = np.empty(shape, dtype=bool)
+        self._outlier = np.empty(shape, dtype=bool)
+        self._outputs = [np.empty(shape, dtype=dtype) for _ in range(output_buffers_count)]
+        self._next_output = 0
+        self._output = None
+        self._frames = 0
+
+    def _start(self, pixels):
+        self._mean[...] = pixels
+        self._m2.fill(0)
+        self._counts.fill(1)
+        self._rejected = 0
+        self._misaligned = 0
+        self._last_shift = (0, 0)
+        self._reference_spectrum = self._reference_windows = None
+        if self._align:
+            self._start_alignment(pixels)
+
+    def _start_alignment(self, pixels):
+        # the frame is binned so the correlation over the whole search range takes one FFT of about align_size
+        self._bin = 1
+        while max(pixels.shape) // (self._bin * 2) >= align_size:
+            self._bin *= 2
+        reference = _stars_only(_binned(pixels, self._bin))
+        self._search = min(-(-self._max_shift // self._bin), min(reference.shape) // 4)
+        self._fft_shape = tuple(_fft_size(n + self._search + 1) for n in reference.shape)
+        self._reference_spectrum = np.fft.rfft2(reference, self._fft_shape)
+        self._reference_energy = float(np.square(reference, dtype=np.float64).sum())
+        self._reference_windows = []
+        if self._bin == 1:
+            return
+        r = refine_radius + self._bin
+        for y, x in _brightest(reference, refine_stars, refine_radius):
+            y, x = y * self._bin + self._bin // 2, x * self._bin + self._bin // 2
+            window = pixels[max(y - r, 0):y + r + 1, max(x - r, 0):x + r + 1].astype(np.float32)
+            self._reference_windows.append((max(y - r, 0), max(x - r, 0), window - window.mean()))
+
+    def _coarse_shift(self, pixels):
+        frame = _stars_only(_binned(pixels, self._bin))
+        spectrum = np.fft.rfft2(frame, self._fft_shape)
+        spectrum *= np.conj(self._reference_spectrum)
+        correlation = np.fft.irfft2(spectrum, self._fft_shape)
+        # only shifts within the search range, negative ones wrap around to the end of the correlation
+        offsets = np.arange(-self._search, self._search + 1)
+        scores = correlation[np.ix_(offsets % self._fft_shape[0], offsets % self._fft_shape[1])]
+        i, j = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        energy = self._reference_energy * float(np.square(frame, dtype=np.float64).sum())
+        peak = float(scores[i, j]) / np.sqrt(energy) if energy > 0 else 0.0
+        return int(offsets[i]), int(offsets[j]), peak
+
+    def _refine_shift(self, pixels, dy, dx):
+        # the binned shift is only good to a bin, it is refined at full resolution around the brightest stars
+        b = self._bin
+        scores = np.zeros((2 * b + 1, 2 * b + 1), dtype=np.float32)
+        for y, x, window in self._reference_windows:
+            top, left = y + dy - b, x + dx - b
+            bottom, right = top + window.shape[0] + 2 * b, left + window.shape[1] + 2 * b
+            if top < 0 or left < 0 or bottom > pixels.shape[0] or right > pixels.shape[1]:
+                continue
+            region = pixels[top:bottom, left:right].astype(np.float32)
+            views = np.lib.stride_tricks.sliding_window_view(region, window.shape)
+            scores += np.einsum("ijkl,kl->ij", views, window)
+        i, j = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        return dy + int(i) - b, dx + int(j) - b
+
+    def _estimate_shift(self, pixels):
+        # shift of the frame against the first one, None when it cannot be trusted
+        dy, dx, peak = self._coarse_shift(pixels)
+        if peak < min_peak_correlation:
+            logger.debug(f"Weak alignment peak {peak:.2f} at shift {(dy * self._bin, dx * self._bin)}")
+            return None
+        dy, dx = dy * self._bin, dx * self._bin
+        if self._reference_windows:
+            dy, dx = self._refine_shift(pixels, dy, dx)
+        if abs(dy) >= self._max_shift or abs(dx) >= self._max_shift:
+            logger.debug(f"Alignment shift {(dy, dx)} is at the {self._max_shift} pixel search limit")
+            return None
+        return dy, dx
+
+    def _accumulate(self, x, mean, m2, counts, delta, step, accepted, outlier):
+        # Welford update of the running mean and the sum of squared deviations, in place on views
+        np.subtract(x, mean, out=delta)
+        if self._clip_kappa is not None and self._frames >= min_frames_for_clipping:
+            np.subtract(counts, 1, out=step)
+            np.maximum(step, 1, out=step)
+            np.divide(m2, step, out=step)
+            np.sqrt(step, out=step)
+            np.maximum(step, min_sigma, out=step)
+            step *= self._clip_kappa
+            np.greater(delta, step, out=outlier)
+            np.negative(step, out=step)
+            np.less(delta, step, out=accepted)
+            np.logical_or(outlier, accepted, out=outlier)
+            # pixels without enough history of their own, e.g. at the edges after a shift, are never clipped
+            np.less(counts, min_frames_for_clipping, out=accepted)
+            np.logical_not(outlier, out=outlier)
+            np.logical_or(outlier, accepted, out=accepted)
+            self._rejected += accepted.size - int(np.count_nonzero(accepted))
+            delta *= accepted
+            np.add(counts, accepted, out=counts)
+        else:
+            counts += 1
+        np.divide(delta, counts, out=step)
+        mean += step
+        if self._clip_kappa is not None:
+            np.subtract(x, mean, out=step)
+            step *= delta
+            m2 += step
+
+    def add(self, pixels):
+        with self._lock:
+            if self._shape != pixels.shape or self._dtype != pixels.dtype:
+                self._allocate(pixels.shape, pixels.dtype)
+            if self._frames >= max_frames:
+                logger.warning(f"Live stack reached {max_frames} frames, starting a new one")
+                self._frames = 0
+            if self._frames == 0:
+                self._start(pixels)
+            else:
+                shift = self._estimate_shift(pixels) if self._reference_spectrum is not None else (0, 0)
+                if shift is None:
+                    # a frame that would be stacked at the wrong shift smears every star, it is left out
+                    self._misaligned += 1
+                    return self._output
+                dy, dx = shift
+                self._last_shift = shift
+                rows, source_rows = _overlap(dy, pixels.shape[0])
+                columns, source_columns = _overlap(dx, pixels.shape[1])
+                views = [a[rows, columns] for a in (self._mean, self._m2, self._counts, self._delta, self._step,
+                                                    self._accepted, self._outlier)]
+                self._accumulate(pixels[source_rows, source_columns], *views)
+            self._frames += 1
+
+            # the stacked mean in the frame's own type, so statistics and stretch treat it like any other frame
+            # it is handed over to the GUI thread as the frame's pixels, so consecutive frames must not share a buffer
+            self._output = self._outputs[self._next_output]
+            self._next_output = (self._next_output + 1) % output_buffers_count
+            np.add(self._mean, 0.5, out=self._step)
+            np.copyto(self._output, self._step, casting="unsafe")
+            return self._output
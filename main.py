@@ -1,7 +1,9 @@
 from PyQt5.QtWidgets import QErrorMessage, QMainWindow, QApplication, QVBoxLayout
-from camera_controls_view import CameraControlsView
-from launcher_view import LauncherView
+from camera_dashboard_view import CameraDashboard
 from config_manager import read_config, init_config
+from connection_pool import ConnectionPool
+from polling_scheduler import PollingScheduler
+from event_loop_thread import EventLoopThread
 from PyQt5.QtGui import QIcon
 import sys
 import logging
@@ -19,21 +21,21 @@ class MainWindow(QMainWindow):
         self.setWindowIcon(QIcon('logo.png'))
         self.config = read_config()
         self.main_layout = QVBoxLayout()
-        self.setWindowTitle("Guiding Launcher")
+        self.setWindowTitle("Remote camera controls")
         self.setGeometry(100, 100, 320, 100)
 
-        self._launcher_view = LauncherView(self.config, self._switch_to_camera, self._error_prompt)
-        self.setCentralWidget(self._launcher_view)
         self._kill_event = Event()
+        self._connection_pool = ConnectionPool.from_config(self.config)
+        self._connection_pool.close_on(self._kill_event)
+        self._scheduler = PollingScheduler(self._kill_event)
+        self._loop_thread = EventLoopThread()
+        self._loop_thread.stop_on(self._kill_event)
+
+        self._dashboard = CameraDashboard(self.config, self._error_prompt, self._kill_event, self._connection_pool,
+                                          self._scheduler, self._loop_thread)
+        self.setCentralWidget(self._dashboard)
         self.show()
 
-    def _switch_to_camera(self, ip, camera_index, camera_name):
-        logger.debug(f"Switching to camera: {camera_name}")
-        camera_controls_view = CameraControlsView(self.config, ip, camera_index, camera_name, self._error_prompt,
-                                                  self._kill_event)
-        self.setCentralWidget(camera_controls_view)
-        self.setWindowTitle("Remote camera controls")
-
     def _error_prompt(self, t):
         logger.error(t)
         error_dialog = QErrorMessage(self)
@@ -0,0 +1,112 @@
+import bisect
+import csv
+import io
+import json
+import logging
+from threading import Lock
+from time import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# bucket upper bounds in seconds, roughly logarithmic from 1 ms up to a minute
+latency_buckets_s = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
+snapshot_columns = ["kind", "name", "count", "errors", "bytes", "mean_ms", "p50_ms", "p95_ms", "max_ms"]
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(latency_buckets_s) + 1)
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(latency_buckets_s, seconds)] += 1
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+    def mean_s(self):
+        return self.total_s / self.count if self.count else 0.0
+
+    def percentile_s(self, percentile):
+        if not self.count:
+            return 0.0
+        rank = percentile / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                # the bucket upper bound, which is never above the largest value seen
+                return min(latency_buckets_s[i], self.max_s) if i < len(latency_buckets_s) else self.max_s
+        return self.max_s
+
+
+class MetricEntry:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.bytes = 0
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = {"endpoint": {}, "stage": {}}
+
+    def _entry(self, kind, name):
+        entries = self._entries[kind]
+        entry = entries.get(name)
+        if entry is None:
+            entry = entries[name] = MetricEntry()
+        return entry
+
+    def record_request(self, endpoint, seconds, transferred_bytes=0, ok=True):
+        with self._lock:
+            entry = self._entry("endpoint", endpoint)
+            entry.latency.add(seconds)
+            entry.bytes += transferred_bytes
+            if not ok:
+                entry.errors += 1
+
+    def record_bytes(self, endpoint, transferred_bytes):
+        with self._lock:
+            self._entry("endpoint", endpoint).bytes += transferred_bytes
+
+    def record_stage(self, stage, seconds):
+        with self._lock:
+            self._entry("stage", stage).latency.add(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._entries = {"endpoint": {}, "stage": {}}
+
+    def snapshot(self):
+        rows = []
+        with self._lock:
+            for kind, entries in self._entries.items():
+                for name, entry in sorted(entries.items()):
+                    h = entry.latency
+                    rows.append({"kind": kind, "name": name, "count": h.count, "errors": entry.errors,
+                                 "bytes": entry.bytes, "mean_ms": round(h.mean_s() * 1000, 2),
+                                 "p50_ms": round(h.percentile_s(50) * 1000, 2),
+                                 "p95_ms": round(h.percentile_s(95) * 1000, 2), "max_ms": round(h.max_s * 1000, 2)})
+        return rows
+
+    def to_json(self):
+        return json.dumps({"timestamp": time(), "metrics": self.snapshot()}, indent=2)
+
+    def to_csv(self):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=snapshot_columns)
+        writer.writeheader()
+        writer.writerows(self.snapshot())
+        return out.getvalue()
+
+    def export(self, path):
+        content = self.to_json() if path.lower().endswith(".json") else self.to_csv()
+        with open(path, "w", newline="") as f:
+            f.write(content)
+        logger.info(f"Metrics snapshot written to {path}")
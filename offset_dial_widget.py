@@ -22,19 +22,29 @@ class OffsetDial(QWidget):
         self.setLayout(self._layout)
         self.setMaximumSize(150, 50)
 
+    @staticmethod
+    def required_properties():
+        return ["get_offset"]
+
     def _changed_offset(self, value):
         logger.debug(f"Setting offset to value: {value}")
         offset_str = str(value)
-        self._requester.set_offset(offset_str)
+        self._requester.call(self._requester.set_offset(offset_str))
 
     def _refresh_impl(self):
-        is_ok, offset_raw = self._requester.get_offset()
+        self._requester.call(self._requester.get_offset(), self._show_offset)
+
+    def _show_offset(self, result):
+        is_ok, offset_raw = result
         if not is_ok:
             logger.error("Could not get current offset value!")
             return
         logger.debug(f"Acquired current offset: {offset_raw}")
         offset = int(offset_raw)
+        # the value read from the camera is not sent back to it
+        self._offset_spin.blockSignals(True)
         self._offset_spin.setValue(offset)
+        self._offset_spin.blockSignals(False)
 
     def refresh(self):
         logger.debug("Refreshing offset info...")
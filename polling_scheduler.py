@@ -0,0 +1,163 @@
+import heapq
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from threading import Thread, Condition, Event
+from time import monotonic
+
+
+logger = logging.getLogger(__name__)
+
+
+# enough for the refreshes of several cameras to wait on slow hosts at once
+default_workers = 8
+default_jitter_fraction = 0.05
+
+
+class ScheduledTask:
+    def __init__(self, callback, interval_s, fixed_rate, jitter_s, name):
+        self.callback = callback
+        self.interval_s = interval_s
+        self.fixed_rate = fixed_rate
+        self.jitter_s = jitter_s
+        self.name = name
+        self.base_time = 0.0
+        self.running = False
+        self.paused = False
+        self.cancelled = False
+        self.skipped = 0
+
+    def __repr__(self):
+        kind = "fixed-rate" if self.fixed_rate else "fixed-delay"
+        return f"ScheduledTask({self.name}, {kind} {self.interval_s}s)"
+
+    def cancel(self):
+        self.cancelled = True
+
+    def set_interval(self, interval_s):
+        # takes effect from the next tick on
+        self.interval_s = interval_s
+
+    def set_paused(self, paused):
+        if paused != self.paused:
+            logger.debug(f"{'Pausing' if paused else 'Resuming'} {self}")
+        self.paused = paused
+
+    def pause(self):
+        self.set_paused(True)
+
+    def resume(self):
+        self.set_paused(False)
+
+
+class PollingScheduler:
+    def __init__(self, kill_event: Event = None, workers=default_workers, name="PollingScheduler"):
+        self._kill_event = kill_event
+        self._condition = Condition()
+        self._heap = []
+        self._sequence = count()
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}Task")
+        self._thread = Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        if kill_event is not None:
+            self.stop_on(kill_event)
+
+    def schedule(self, callback, interval_s, fixed_rate=True, jitter_s=None, initial_delay_s=None, name=None):
+        if jitter_s is None:
+            jitter_s = interval_s * default_jitter_fraction
+        task = ScheduledTask(callback, interval_s, fixed_rate, jitter_s, name or getattr(callback, "__name__", "task"))
+        logger.debug(f"Scheduling {task}")
+        task.base_time = monotonic() + (interval_s if initial_delay_s is None else initial_delay_s)
+        self._push(task)
+        return task
+
+    def submit(self, callback, *args):
+        # one-off work shares the worker pool with the periodic tasks
+        return self._executor.submit(callback, *args)
+
+    def _push(self, task):
+        # jitter is only added to the run time, fixed-rate tasks keep their base time so they do not drift
+        run_time = task.base_time + (random.uniform(0, task.jitter_s) if task.jitter_s > 0 else 0.0)
+        with self._condition:
+            heapq.heappush(self._heap, (run_time, next(self._sequence), task))
+            self._condition.notify()
+
+    def _should_stop(self):
+        return self._stopped or (self._kill_event is not None and self._kill_event.is_set())
+
+    def _next_due_task(self):
+        with self._condition:
+            while not self._should_stop():
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                run_time, _, task = self._heap[0]
+                delay = run_time - monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                return task
+            return None
+
+    def _run(self):
+        logger.debug("Polling scheduler started")
+        while True:
+            task = self._next_due_task()
+            if task is None:
+                break
+            if task.cancelled:
+                logger.debug(f"Dropping cancelled {task}")
+                continue
+            if task.paused or task.running:
+                if task.running:
+                    # a slow callback makes the task skip this tick instead of running twice at once
+                    task.skipped += 1
+                    logger.debug(f"Previous run of {task} still in progress, skipping tick")
+                self._reschedule(task, monotonic())
+                continue
+            task.running = True
+            if task.fixed_rate:
+                self._reschedule(task, monotonic())
+            try:
+                self._executor.submit(self._execute, task)
+            except RuntimeError:
+                break
+        logger.debug("Polling scheduler stopped")
+
+    def _reschedule(self, task, now):
+        if task.cancelled or self._should_stop():
+            return
+        if task.fixed_rate:
+            task.base_time += task.interval_s
+            if task.base_time <= now:
+                missed = int((now - task.base_time) // task.interval_s) + 1
+                task.base_time += missed * task.interval_s
+        else:
+            task.base_time = now + task.interval_s
+        self._push(task)
+
+    def _execute(self, task):
+        try:
+            task.callback()
+        except Exception as e:
+            logger.error(f"{task} failed: {e}")
+        finally:
+            task.running = False
+        if not task.fixed_rate:
+            self._reschedule(task, monotonic())
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop_on(self, kill_event: Event):
+        def wait_and_stop():
+            kill_event.wait()
+            self.stop()
+
+        Thread(target=wait_and_stop, name="PollingSchedulerStopper", daemon=True).start()
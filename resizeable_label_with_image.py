@@ -1,31 +1,214 @@
-from PyQt5.QtWidgets import QLabel
+from PyQt5.QtWidgets import QWidget
 import logging
-from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtCore import Qt, QRectF, QPointF, pyqtSignal
+from time import perf_counter
+
+import numpy as np
+
+from image_pyramid import ImagePyramid, tile_size
 
 
 logger = logging.getLogger(__name__)
 
 
-class ResizeableLabelWithImage(QLabel):
+zoom_step = 1.25
+max_zoom = 8.0
+min_roi_size = 8
+
+
+def qimage_from_display_pixels(pixels):
+    h, w = pixels.shape[:2]
+    image_format = QImage.Format_Grayscale8 if pixels.ndim == 2 else QImage.Format_RGB888
+    # the caller has to keep pixels alive for as long as the image is used
+    return QImage(pixels.data, w, h, pixels.strides[0], image_format)
+
+
+class ResizeableLabelWithImage(QWidget):
+    # x, y, width and height of a region drawn with shift and the left button, in pixels of the shown frame
+    roi_drawn = pyqtSignal(int, int, int, int)
+
     def __init__(self, parent):
-        QLabel.__init__(self, parent)
-        self._original_image = None
-        bg_img = QImage(320, 200, QImage.Format_Grayscale8)
-        bg_img.fill(Qt.black)
-        self.set_image(bg_img)
+        super(ResizeableLabelWithImage, self).__init__(parent)
+        self._pyramid = None
+        self._tile_images = {}
+        # None fits the whole frame into the widget, otherwise screen pixels per frame pixel
+        self._zoom = None
+        self._center = None
+        self._drag_position = None
+        self._roi_start = None
+        self._roi_end = None
+        self._roi_overlay = None
+        self._metrics = None
+        self._widget_size = (640, 480)
         self.setMinimumSize(640, 480)
+        self.set_pixels(np.zeros((200, 320), dtype=np.uint8))
+
+    def set_pixels(self, pixels, owner=None):
+        self.set_pyramid(ImagePyramid(pixels, owner))
+
+    def set_pyramid(self, pyramid: ImagePyramid):
+        previous = self._pyramid
+        if previous is None or (previous.width(), previous.height()) != (pyramid.width(), pyramid.height()):
+            logger.debug(f"Frame size is now {pyramid.width()}x{pyramid.height()} px")
+            self._zoom = None
+            self._center = None
+        self._pyramid = pyramid
+        self._tile_images = {}
+        self.update()
+
+    def set_metrics(self, metrics):
+        # paint times are recorded as the "paint" stage next to the decode stages
+        self._metrics = metrics
+
+    def set_roi_overlay(self, region):
+        # a FrameRegion outlined on top of the frame, or None
+        self._roi_overlay = region
+        self.update()
+
+    def _fit_scale(self, width, height):
+        widget_width, widget_height = self._widget_size
+        return min(widget_width / width, widget_height / height)
+
+    def scale_for(self, width, height):
+        # read from the decode thread to prepare the pyramid level the next paint will need
+        return self._zoom if self._zoom is not None else self._fit_scale(width, height)
+
+    def _scale(self):
+        return self.scale_for(self._pyramid.width(), self._pyramid.height())
+
+    def _view_center(self):
+        if self._zoom is None or self._center is None:
+            return self._pyramid.width() / 2, self._pyramid.height() / 2
+        return self._center
+
+    def _set_view(self, zoom, center):
+        if zoom <= self._fit_scale(self._pyramid.width(), self._pyramid.height()):
+            self._zoom = None
+            self._center = None
+        else:
+            self._zoom = min(zoom, max_zoom)
+            x, y = center
+            self._center = (min(max(x, 0.0), self._pyramid.width()), min(max(y, 0.0), self._pyramid.height()))
+        self.update()
+
+    def _screen_rect(self, x, y, width, height):
+        scale = self._scale()
+        cx, cy = self._view_center()
+        return QRectF((x - cx) * scale + self.width() / 2, (y - cy) * scale + self.height() / 2,
+                      width * scale, height * scale)
+
+    def _drawn_roi(self):
+        (x0, y0), (x1, y1) = self._roi_start, self._roi_end
+        left, top = max(0, int(min(x0, x1))), max(0, int(min(y0, y1)))
+        right = min(self._pyramid.width(), int(max(x0, x1)) + 1)
+        bottom = min(self._pyramid.height(), int(max(y0, y1)) + 1)
+        return left, top, right - left, bottom - top
+
+    def _frame_point(self, position: QPointF):
+        scale = self._scale()
+        x, y = self._view_center()
+        return x + (position.x() - self.width() / 2) / scale, y + (position.y() - self.height() / 2) / scale
+
+    def _tile_image(self, level, column, row):
+        key = (level, column, row)
+        image = self._tile_images.get(key)
+        if image is None:
+            # the pyramid keeps the tile array alive for as long as the image is cached here
+            image = self._tile_images[key] = qimage_from_display_pixels(self._pyramid.tile(level, column, row))
+        return image
+
+    def paintEvent(self, event):
+        start_time = perf_counter()
+        painter = QPainter(self)
+        self._paint(painter)
+        painter.end()
+        if self._metrics is not None:
+            self._metrics.record_stage("paint", perf_counter() - start_time)
+
+    def _paint(self, painter):
+        painter.fillRect(self.rect(), Qt.black)
+        if self._pyramid is None:
+            return
+        scale = self._scale()
+        x, y = self._view_center()
+        left, top = x - self.width() / (2 * scale), y - self.height() / (2 * scale)
+        right, bottom = x + self.width() / (2 * scale), y + self.height() / (2 * scale)
+
+        # only the tiles of one level in view are drawn, so painting does not grow with the sensor size
+        level = self._pyramid.level_for_scale(scale)
+        factor = 2 ** level
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, scale * factor < 1.0)
+        for column, row in self._pyramid.visible_tiles(level, left, top, right, bottom):
+            image = self._tile_image(level, column, row)
+            target = QRectF((column * tile_size * factor - left) * scale, (row * tile_size * factor - top) * scale,
+                            image.width() * factor * scale, image.height() * factor * scale)
+            painter.drawImage(target, image)
+
+        if self._zoom is not None:
+            painter.setPen(Qt.yellow)
+            painter.drawText(8, 16, f"{self._zoom:.0%}")
+        if self._roi_start is not None and self._roi_end is not None:
+            painter.setPen(Qt.green)
+            painter.drawRect(self._screen_rect(*self._drawn_roi()))
+        elif self._roi_overlay is not None:
+            painter.setPen(Qt.green)
+            painter.drawRect(self._screen_rect(*self._roi_overlay.as_tuple()))
+
+    def wheelEvent(self, event):
+        if self._pyramid is None:
+            return
+        steps = event.angleDelta().y() / 120
+        # the frame point under the cursor stays where it is
+        position = event.pos()
+        x, y = self._frame_point(position)
+        zoom = self._scale() * zoom_step ** steps
+        self._set_view(zoom, (x - (position.x() - self.width() / 2) / zoom,
+                              y - (position.y() - self.height() / 2) / zoom))
+
+    def mouseDoubleClickEvent(self, event):
+        # toggles between the whole frame and 1:1 around the clicked point, e.g. on a star for focusing
+        if self._pyramid is None:
+            return
+        if self._zoom is None:
+            self._set_view(1.0, self._frame_point(event.pos()))
+        else:
+            self._set_view(0.0, None)
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton or self._pyramid is None:
+            return
+        if event.modifiers() & Qt.ShiftModifier:
+            self._roi_start = self._frame_point(event.pos())
+        else:
+            self._drag_position = event.pos()
+
+    def mouseMoveEvent(self, event):
+        if self._roi_start is not None:
+            self._roi_end = self._frame_point(event.pos())
+            self.update()
+            return
+        if self._drag_position is None or self._zoom is None:
+            return
+        dx, dy = event.pos().x() - self._drag_position.x(), event.pos().y() - self._drag_position.y()
+        self._drag_position = event.pos()
+        x, y = self._view_center()
+        self._set_view(self._zoom, (x - dx / self._zoom, y - dy / self._zoom))
 
-    def set_image(self, img: QImage):
-        self._original_image = QPixmap(img)
-        width = self.frameGeometry().width()
-        height = self.frameGeometry().height()
-        logger.debug(f"Label size is currently: {width}x{height} px")
-        qp = self._original_image.scaled(width, height, Qt.KeepAspectRatio)
-        self.setPixmap(qp)
+    def mouseReleaseEvent(self, event):
+        self._drag_position = None
+        if self._roi_start is None:
+            return
+        if self._roi_end is not None:
+            x, y, width, height = self._drawn_roi()
+            if width >= min_roi_size and height >= min_roi_size:
+                logger.debug(f"Region of interest drawn: {width}x{height} at {x},{y}")
+                self.roi_drawn.emit(x, y, width, height)
+        self._roi_start = None
+        self._roi_end = None
+        self.update()
 
     def resizeEvent(self, event):
-        if self._original_image is not None:
-            pixmap = self._original_image.scaled(self.width(), self.height())
-            self.setPixmap(pixmap)
-        self.resize(self.width(), self.height())
+        # nothing is rescaled here, the next paint just draws the visible tiles at the new size
+        self._widget_size = (max(1, self.width()), max(1, self.height()))
+        super(ResizeableLabelWithImage, self).resizeEvent(event)
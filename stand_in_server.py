@@ -0,0 +1,433 @@
+import argparse
+import json
+import logging
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Condition, Event
+from time import sleep, time
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from frame_stream import frame_header, frame_magic, stream_content_type
+from frame_compression import accept_compression_header, compression_header, frame_size_header, choose_codec, \
+    compress
+from frame_freshness import etag_for, frame_sequence_header, wait_after_param, wait_timeout_param
+from frame_geometry import FrameRegion, roi_header, roi_param
+
+
+logger = logging.getLogger(__name__)
+
+
+camera_path = re.compile(r"^/camera/(\d+)/(\w+)$")
+frame_timestamp_header = "X-Frame-Timestamp"
+stars_per_megapixel = 40
+star_stamp_radius = 7
+write_chunk_size = 1 << 16
+
+
+def star_field(w, h, maxv, rng):
+    field = np.full((h, w), 0.05 * maxv, dtype=np.float32)
+    stars = max(1, int(stars_per_megapixel * w * h / 1e6))
+    r = star_stamp_radius
+    ys, xs = np.mgrid[-r:r + 1, -r:r + 1]
+    for _ in range(stars):
+        x, y = rng.integers(r, w - r), rng.integers(r, h - r)
+        sigma = rng.uniform(0.8, 2.0)
+        peak = maxv * min(0.9, rng.pareto(1.5) * 0.05 + 0.02)
+        stamp = peak * np.exp(-(xs ** 2 + ys ** 2) / (2 * sigma ** 2))
+        field[y - r:y + r + 1, x - r:x + r + 1] += stamp
+    return field
+
+
+def encode_jpg(frame):
+    # Qt is already a dependency of the client, so it also encodes the stand-in JPEGs
+    from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt5.QtGui import QImage
+    # crops are views into the whole frame, QImage needs rows of contiguous pixels
+    pixels = np.ascontiguousarray(frame if frame.dtype == np.uint8 else (frame >> 8).astype(np.uint8))
+    h, w = pixels.shape
+    image = QImage(pixels.data, w, h, pixels.strides[0], QImage.Format_Grayscale8)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    if not image.save(buffer, "JPG", 90):
+        return None
+    return bytes(data)
+
+
+class StandInCamera:
+    def __init__(self, name="Stand-in camera", width=1036, height=705, max_bin=4):
+        self.name = name
+        self._sensor_width = width
+        self._sensor_height = height
+        self._rng = np.random.default_rng()
+        self._properties = {
+            "get_gain": 120,
+            "get_offset": 30,
+            "get_exposure": 1000000,
+            "get_readoutmodes": ["RAW8", "RAW16"],
+            "get_readoutmode_str": "RAW16",
+            "get_maxbinx": max_bin,
+            "get_binx": 1,
+            # subframe in binned pixels, a size of 0 reads out the rest of the frame
+            "get_startx": 0,
+            "get_starty": 0,
+            "get_numx": 0,
+            "get_numy": 0,
+            "get_cansetcooleron": True,
+            "get_cansetccdtemperature": True,
+            "get_cangetcoolerpower": True,
+            "get_cooleron": False,
+            "get_ccdtemperature": 20.0,
+            "get_setccdtemperature": 0,
+            "get_coolerpower": 0,
+        }
+        self._state = "IDLE"
+        self._saving_target = 0
+        self._saved = 0
+        self._field = None
+        self._field_maxv = None
+        self._noise = None
+        self._frame_condition = Condition()
+        self._frame = None
+        self._frame_time = 0.0
+        self._sequence = 0
+        self._capturing = Event()
+        self._closed = Event()
+        self._capture_thread = Thread(target=self._capture_loop, name="StandInCapture", daemon=True)
+        self._capture_thread.start()
+
+    def _full_size(self):
+        return self._sensor_width // self._properties["get_binx"], self._sensor_height // self._properties["get_binx"]
+
+    def _subframe(self):
+        full_width, full_height = self._full_size()
+        p = self._properties
+        region = FrameRegion(p["get_startx"], p["get_starty"], p["get_numx"] or full_width, p["get_numy"] or full_height)
+        return region.clamped(full_width, full_height) or FrameRegion(0, 0, full_width, full_height)
+
+    def get_property(self, name):
+        if name == "get_cameraxsize":
+            return self._sensor_width
+        if name == "get_cameraysize":
+            return self._sensor_height
+        if name == "get_numx":
+            return self._subframe().width
+        if name == "get_numy":
+            return self._subframe().height
+        if name in ("get_startx", "get_starty"):
+            return getattr(self._subframe(), name[-1])
+        if name == "get_status":
+            if self._state == "SAVE":
+                return {"state": self._state, "number": self._saved}
+            return {"state": self._state}
+        return self._properties.get(name)
+
+    def set_property(self, name, value):
+        getter = "get_" + name[len("set_"):]
+        if getter not in self._properties:
+            return False
+        current = self._properties[getter]
+        if getter == "get_exposure":
+            # exposure is set in seconds but reported in microseconds
+            value = float(value) * 1000000
+        if isinstance(current, bool):
+            value = value in (True, "True", "true", "1")
+        elif isinstance(current, int):
+            value = int(float(value))
+        elif isinstance(current, float):
+            value = float(value)
+        self._properties[getter] = value
+        if getter == "get_binx":
+            self._properties.update({"get_startx": 0, "get_starty": 0, "get_numx": 0, "get_numy": 0})
+        return True
+
+    def start_capturing(self):
+        self._state = "CAPTURE"
+        self._capturing.set()
+
+    def stop_capturing(self):
+        self._state = "IDLE"
+        self._capturing.clear()
+
+    def start_saving(self, number):
+        # nothing is written by the stand-in, it only reports progress like the real server does
+        self._saving_target = int(number)
+        self._saved = 0
+        self._state = "SAVE"
+        self._capturing.set()
+
+    def stop_saving(self):
+        if self._state == "SAVE":
+            self._state = "CAPTURE"
+
+    def exposure_s(self):
+        return self._properties["get_exposure"] / 1000000.0
+
+    def _render_frame(self):
+        w, h = self._full_size()
+        is16b = self._properties["get_readoutmode_str"] == "RAW16"
+        maxv = 65535 if is16b else 255
+        if self._field is None or self._field.shape != (h, w) or self._field_maxv != maxv:
+            self._field = star_field(w, h, maxv, self._rng)
+            self._noise = self._rng.normal(0, 0.01 * maxv, (h, w)).astype(np.float32)
+            self._field_maxv = maxv
+        # the whole field drifts by up to a pixel and the noise is shifted, so consecutive frames differ;
+        # only the subframe is rendered, so small subframes are cheap
+        region = self._subframe()
+        rows = np.arange(region.y, region.y + region.height)
+        columns = np.arange(region.x, region.x + region.width)
+        dy, dx = self._rng.integers(-1, 2, 2)
+        sy, sx = self._rng.integers(0, (h, w))
+        frame = self._field[np.ix_((rows - dy) % h, (columns - dx) % w)]
+        frame += self._noise[np.ix_((rows - sy) % h, (columns - sx) % w)]
+        return np.clip(frame, 0, maxv).astype(np.uint16 if is16b else np.uint8)
+
+    def _capture_loop(self):
+        while not self._closed.is_set():
+            if not self._capturing.wait(0.1):
+                continue
+            if self._closed.wait(self.exposure_s()):
+                break
+            frame = self._render_frame()
+            with self._frame_condition:
+                self._frame = frame
+                self._frame_time = time()
+                self._sequence += 1
+                self._frame_condition.notify_all()
+            if self._state == "SAVE":
+                self._saved += 1
+                if self._saved >= self._saving_target:
+                    self._state = "CAPTURE"
+
+    def last_frame(self):
+        with self._frame_condition:
+            if self._frame is None:
+                self._frame = self._render_frame()
+                self._frame_time = time()
+            return self._sequence, self._frame
+
+    def frame_time(self):
+        return self._frame_time
+
+    def wait_for_frame_after(self, sequence, timeout_s):
+        with self._frame_condition:
+            self._frame_condition.wait_for(lambda: self._sequence > sequence or self._closed.is_set(), timeout_s)
+            return self._sequence, self._frame
+
+    def close(self):
+        self._closed.set()
+        with self._frame_condition:
+            self._frame_condition.notify_all()
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _cameras(self):
+        return self.server.cameras
+
+    def _write_throttled(self, body):
+        bandwidth = self.server.bandwidth_bytes_per_s
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        view = memoryview(body)
+        for start in range(0, len(view), write_chunk_size):
+            chunk = view[start:start + write_chunk_size]
+            self.wfile.write(chunk)
+            sleep(len(chunk) / bandwidth)
+
+    def _send_bytes(self, body, content_type="application/octet-stream", status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self._write_throttled(body)
+
+    def _simulate_latency(self):
+        if self.server.latency_s:
+            sleep(self.server.latency_s)
+
+    def _send_json(self, content, status=200):
+        self._send_bytes(json.dumps(content).encode(), "application/json", status)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _camera_and_endpoint(self, path):
+        match = camera_path.match(path)
+        if match is None:
+            return None, None
+        index = int(match.group(1))
+        if index >= len(self._cameras()):
+            return None, None
+        return self._cameras()[index], match.group(2)
+
+    def do_GET(self):
+        self._simulate_latency()
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/cameras_list":
+            return self._send_json({"cameras": [c.name for c in self._cameras()]})
+
+        camera, endpoint = self._camera_and_endpoint(url.path)
+        if camera is None:
+            return self._send_json({"detail": "Not Found"}, 404)
+        if endpoint == "get_last_image":
+            return self._send_last_image(camera, query)
+        if endpoint == "stream_frames":
+            return self._stream_frames(camera, query)
+        if endpoint == "get_properties":
+            names = query.get("names", [""])[0].split(",")
+            return self._send_json({"values": {n: camera.get_property(n) for n in names
+                                               if camera.get_property(n) is not None}})
+
+        value = camera.get_property(endpoint)
+        if value is None:
+            return self._send_json({"detail": "Not Found"}, 404)
+        self._send_json({"value": value})
+
+    def do_POST(self):
+        self._simulate_latency()
+        url = urlsplit(self.path)
+        data = self._read_json()
+        camera, endpoint = self._camera_and_endpoint(url.path)
+        if camera is None:
+            return self._send_json({"detail": "Not Found"}, 404)
+        if endpoint == "init_camera":
+            return self._send_json({"result": "OK"})
+        if endpoint == "start_capturing":
+            camera.start_capturing()
+            return self._send_json({"result": "OK"})
+        if endpoint == "stop_capturing":
+            camera.stop_capturing()
+            return self._send_json({"result": "OK"})
+        if endpoint == "start_saving":
+            camera.start_saving(data.get("number", 1))
+            return self._send_json({"result": "OK"})
+        if endpoint == "stop_saving":
+            camera.stop_saving()
+            return self._send_json({"result": "OK"})
+        if not camera.set_property(endpoint, data.get("value")):
+            return self._send_json({"detail": "Not Found"}, 404)
+        self._send_json({"result": "OK"})
+
+    def _send_last_image(self, camera, query):
+        image_format = query.get("format", ["raw"])[0]
+        if image_format not in ("raw", "jpg"):
+            return self._send_json({"detail": f"Unknown image format: {image_format}"}, 422)
+        if wait_after_param in query:
+            timeout_s = float(query.get(wait_timeout_param, ["5"])[0])
+            sequence, frame = camera.wait_for_frame_after(int(query[wait_after_param][0]), timeout_s)
+        else:
+            sequence, frame = camera.last_frame()
+        region = None
+        if roi_param in query and frame is not None:
+            region = FrameRegion.from_param(query[roi_param][0])
+            if region is None or region.clamped(frame.shape[1], frame.shape[0]) is None:
+                return self._send_json({"detail": f"Invalid region of interest: {query[roi_param][0]}"}, 422)
+            region = region.clamped(frame.shape[1], frame.shape[0])
+        # a crop of the same frame is a different representation, so it gets its own tag
+        etag = etag_for(sequence, image_format if region is None else f"{image_format}-{region.as_param()}")
+        freshness = {"ETag": etag, frame_sequence_header: str(sequence),
+                     frame_timestamp_header: f"{camera.frame_time():.6f}"}
+        if self.headers.get("If-None-Match") == etag or frame is None:
+            return self._send_bytes(b"", status=304, headers=freshness)
+        if region is not None:
+            frame = frame[region.y:region.y + region.height, region.x:region.x + region.width]
+            freshness[roi_header] = region.as_param()
+        if image_format == "jpg":
+            body = encode_jpg(frame)
+            if body is None:
+                return self._send_json({"detail": "JPEG encoding is not available"}, 422)
+            return self._send_bytes(body, "image/jpeg", headers=freshness)
+        body = frame.tobytes()
+        codec = choose_codec(self.headers.get(accept_compression_header, ""))
+        if codec is None:
+            return self._send_bytes(body, headers=freshness)
+        compressed = compress(codec, body)
+        freshness.update({compression_header: codec, frame_size_header: str(len(body))})
+        self._send_bytes(compressed, headers=freshness)
+
+    def _stream_frames(self, camera, query):
+        if query.get("format", ["raw"])[0] != "raw":
+            return self._send_json({"detail": "Only raw frames are streamed"}, 422)
+        self.send_response(200)
+        self.send_header("Content-Type", stream_content_type)
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        sequence, _ = camera.last_frame()
+        try:
+            while not self.server.closed.is_set():
+                new_sequence, frame = camera.wait_for_frame_after(sequence, 1.0)
+                if new_sequence == sequence:
+                    continue
+                sequence = new_sequence
+                payload = frame.tobytes()
+                self.wfile.write(frame_header.pack(frame_magic, sequence, len(payload)))
+                self._write_throttled(payload)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Stream client disconnected")
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=8080, host="127.0.0.1", cameras=None, latency_s=0.0, bandwidth_bytes_per_s=None):
+        super(StandInServer, self).__init__((host, port), StandInRequestHandler)
+        self.cameras = cameras if cameras is not None else [StandInCamera()]
+        self.latency_s = latency_s
+        self.bandwidth_bytes_per_s = bandwidth_bytes_per_s
+        self.closed = Event()
+        self._thread = None
+
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = Thread(target=self.serve_forever, name="StandInServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.closed.set()
+        for camera in self.cameras:
+            camera.close()
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in camera server for testing without hardware")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--width", type=int, default=1036, help="Sensor width at bin 1")
+    parser.add_argument("--height", type=int, default=705, help="Sensor height at bin 1")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every request")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="Limit of image transfer rate, 0 for none")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    bandwidth = args.bandwidth_mbps * 1e6 / 8 if args.bandwidth_mbps > 0 else None
+    server = StandInServer(args.port, args.host, [StandInCamera(width=args.width, height=args.height)],
+                           latency_s=args.latency_ms / 1000, bandwidth_bytes_per_s=bandwidth)
+    logger.info(f"Serving stand-in camera on {args.host}:{server.port()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
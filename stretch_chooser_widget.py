@@ -0,0 +1,37 @@
+import logging
+from PyQt5.QtWidgets import QWidget, QLabel, QComboBox, QHBoxLayout
+from display_stretch import DisplayStretch, stretch_modes
+
+
+logger = logging.getLogger(__name__)
+
+
+class StretchChooser(QWidget):
+    def __init__(self, default_mode="linear"):
+        super(StretchChooser, self).__init__()
+        self._layout = QHBoxLayout()
+        self._stretch = DisplayStretch(default_mode)
+
+        self._stretch_combo = QComboBox()
+        self._stretch_combo.addItems(stretch_modes)
+        self._stretch_combo.setCurrentText(default_mode)
+        self._stretch_combo.currentTextChanged.connect(self._changed_stretch)
+
+        stretch_label = QLabel("Stretch:")
+        stretch_label.setMaximumSize(60, 20)
+
+        self._layout.addWidget(stretch_label)
+        self._layout.addWidget(self._stretch_combo)
+
+        self.setLayout(self._layout)
+        self.setMaximumSize(200, 50)
+
+    def _changed_stretch(self, t):
+        logger.debug(f"New stretch chosen: {t}")
+        self._stretch.set_mode(t)
+
+    def stretch(self):
+        return self._stretch
+
+    def refresh(self):
+        pass
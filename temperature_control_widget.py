@@ -1,7 +1,7 @@
 import logging
 from PyQt5.QtWidgets import QWidget, QLabel, QPushButton, QHBoxLayout, QSpinBox
 from PyQt5.QtCore import Qt
-from camera_requester import CameraRequester
+from async_camera_requester import AsyncCameraRequester
 
 
 logger = logging.getLogger(__name__)
@@ -10,7 +10,7 @@ logger = logging.getLogger(__name__)
 class TemperatureControl(QWidget):
     def __init__(self, requester):
         super(TemperatureControl, self).__init__()
-        self._requester: CameraRequester = requester
+        self._requester: AsyncCameraRequester = requester
         self._layout = QHBoxLayout()
 
         self._current_temp_label = QLabel("-")
@@ -19,29 +19,15 @@ class TemperatureControl(QWidget):
         self._layout.addWidget(QLabel("Current temp:"), alignment=Qt.AlignRight)
         self._layout.addWidget(self._current_temp_label, alignment=Qt.AlignLeft)
 
-        is_ok, can_turn_on = self._requester.get_can_turn_on_cooler()
-        logger.debug(f"Is ok? {is_ok}, Can turn cooler on: {can_turn_on}")
-        if is_ok and can_turn_on:
-            self._cooler_on_button.setCheckable(True)
-            self._cooler_on_button.clicked.connect(self._turn_cooler_on)
-        else:
-            self._cooler_on_button.setDisabled(True)
-
+        # everything the camera can do is disabled until its capabilities have been read
+        self._cooler_on_button.setDisabled(True)
         self._layout.addWidget(self._cooler_on_button)
 
-        set_temp_spin = QSpinBox()
-        is_ok, can_set_temp = self._requester.get_can_set_temp()
-
-        if not is_ok:
-            set_temp_spin.setDisabled(True)
-        elif can_set_temp:
-            is_ok, set_temp = self._requester.get_set_temp()
-            if is_ok:
-                set_temp_spin.setValue(int(set_temp))
-            set_temp_spin.valueChanged.connect(self._changed_set_temp)
+        self._set_temp_spin = QSpinBox()
+        self._set_temp_spin.setDisabled(True)
 
         self._layout.addWidget(QLabel("Target temperature:"), alignment=Qt.AlignRight)
-        self._layout.addWidget(set_temp_spin, alignment=Qt.AlignLeft)
+        self._layout.addWidget(self._set_temp_spin, alignment=Qt.AlignLeft)
         c_degree = QLabel("°C")
         c_degree.setMaximumSize(20, 20)
         self._layout.addWidget(c_degree, alignment=Qt.AlignLeft)
@@ -50,42 +36,76 @@ class TemperatureControl(QWidget):
         self._cooler_power_label = QLabel("N/A")
         self._cooler_power_label.setDisabled(True)
 
-        is_ok, can_get_power = self._requester.get_can_get_cooler_power()
-        if is_ok and can_get_power:
-            self._cooler_power_label.setDisabled(False)
-
-        self._refresh_impl()
         self._layout.addWidget(self._cooler_power_label, alignment=Qt.AlignLeft)
         self.setLayout(self._layout)
         self.setMaximumSize(600, 50)
+        self._requester.call(self._read_capabilities(), self._show_capabilities)
+
+    async def _read_capabilities(self):
+        return (await self._requester.get_can_turn_on_cooler(), await self._requester.get_can_set_temp(),
+                await self._requester.get_set_temp(), await self._requester.get_can_get_cooler_power())
+
+    def _show_capabilities(self, capabilities):
+        (is_ok, can_turn_on), (is_ok_set, can_set_temp), (is_ok_temp, set_temp), (is_ok_power, can_get_power) = \
+            capabilities
+        logger.debug(f"Is ok? {is_ok}, Can turn cooler on: {can_turn_on}")
+        if is_ok and can_turn_on:
+            self._cooler_on_button.setEnabled(True)
+            self._cooler_on_button.setCheckable(True)
+            self._cooler_on_button.clicked.connect(self._turn_cooler_on)
+
+        if is_ok_set and can_set_temp:
+            self._set_temp_spin.setEnabled(True)
+            if is_ok_temp:
+                self._set_temp_spin.setValue(int(set_temp))
+            self._set_temp_spin.valueChanged.connect(self._changed_set_temp)
+
+        if is_ok_power and can_get_power:
+            self._cooler_power_label.setDisabled(False)
+        self._refresh_impl()
+
+    @staticmethod
+    def required_properties():
+        return ["get_cansetcooleron", "get_cansetccdtemperature", "get_setccdtemperature", "get_cangetcoolerpower",
+                "get_ccdtemperature", "get_cooleron", "get_coolerpower"]
+
+    @staticmethod
+    def refreshed_properties():
+        return ["get_ccdtemperature", "get_cooleron", "get_coolerpower"]
 
     def _turn_cooler_on(self):
         button: QPushButton = self.sender()
         if button.isChecked():
-            self._requester.set_cooler_on(True)
+            self._requester.call(self._requester.set_cooler_on(True))
         else:
-            self._requester.set_cooler_on(False)
+            self._requester.call(self._requester.set_cooler_on(False))
 
     def _changed_set_temp(self, value: int):
-        self._requester.set_set_temp(value)
+        self._requester.call(self._requester.set_set_temp(value))
+
+    async def _read_state(self, with_power):
+        await self._requester.prefetch(self.refreshed_properties())
+        power = await self._requester.get_cooler_power() if with_power else (False, None)
+        return await self._requester.get_temperature(), await self._requester.get_cooler_on(), power
 
     def _refresh_impl(self):
-        is_ok, temp_raw = self._requester.get_temperature()
+        self._requester.call(self._read_state(self._cooler_power_label.isEnabled()), self._show_state)
+
+    def _show_state(self, state):
+        (is_ok, temp_raw), (is_ok_on, is_on), (is_ok_power, power) = state
         if not is_ok:
             logger.error("Could not get current temperature value!")
             return
 
         self._current_temp_label.setText(str(temp_raw) + "°C")
-        is_ok, is_on = self._requester.get_cooler_on()
-        if is_ok:
+        if is_ok_on:
             is_on = bool(is_on)
             logger.debug(f"Cooler is now on?: {is_on}")
             if is_on:
                 self._cooler_on_button.setChecked(True)
             else:
                 self._cooler_on_button.setChecked(False)
-        if self._cooler_power_label.isEnabled():
-            is_ok, power = self._requester.get_cooler_power()
+        if is_ok_power:
             logger.debug(f"Cooling power at {power}%")
             self._cooler_power_label.setText(f"{power}%")
 